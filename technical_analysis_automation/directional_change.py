@@ -2,16 +2,20 @@ import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
+from extremes import extremes_array
 
-def directional_change(close: np.array, high: np.array, low: np.array, sigma: float):
+
+def directional_change(close: np.array, high: np.array, low: np.array, sigma: float, structured: bool = False):
+    # structured=True returns EXTREMES_DTYPE structured arrays instead of lists of lists
     up_zig = True  # Last extreme is a bottom. Next is a top.
     tmp_max = high[0]
     tmp_min = low[0]
     tmp_max_i = 0
     tmp_min_i = 0
 
-    tops = []
-    bottoms = []
+    # Extremes are recorded column by column
+    tops_conf, tops_ext, tops_price = [], [], []
+    bottoms_conf, bottoms_ext, bottoms_price = [], [], []
 
     for i in range(len(close)):
         if up_zig:  # Last extreme is a bottom
@@ -21,11 +25,9 @@ def directional_change(close: np.array, high: np.array, low: np.array, sigma: fl
                 tmp_max_i = i
             elif close[i] < tmp_max - tmp_max * sigma:
                 # Price retraced by sigma %. Top confirmed, record it
-                # top[0] = confirmation index
-                # top[1] = index of top
-                # top[2] = price of top
-                top = [i, tmp_max_i, tmp_max]
-                tops.append(top)
+                tops_conf.append(i)  # Confirmation index
+                tops_ext.append(tmp_max_i)  # Index of top
+                tops_price.append(tmp_max)  # Price of top
 
                 # Setup for next bottom
                 up_zig = False
@@ -38,30 +40,237 @@ def directional_change(close: np.array, high: np.array, low: np.array, sigma: fl
                 tmp_min_i = i
             elif close[i] > tmp_min + tmp_min * sigma:
                 # Price retraced by sigma %. Bottom confirmed, record it
-                # bottom[0] = confirmation index
-                # bottom[1] = index of bottom
-                # bottom[2] = price of bottom
-                bottom = [i, tmp_min_i, tmp_min]
-                bottoms.append(bottom)
+                bottoms_conf.append(i)  # Confirmation index
+                bottoms_ext.append(tmp_min_i)  # Index of bottom
+                bottoms_price.append(tmp_min)  # Price of bottom
 
                 # Setup for next top
                 up_zig = True
                 tmp_max = high[i]
                 tmp_max_i = i
 
+    if structured:
+        return (extremes_array(tops_conf, tops_ext, tops_price),
+                extremes_array(bottoms_conf, bottoms_ext, bottoms_price))
+
+    # top[0] = confirmation index
+    # top[1] = index of top
+    # top[2] = price of top
+    tops = [list(top) for top in zip(tops_conf, tops_ext, tops_price)]
+    bottoms = [list(bottom) for bottom in zip(bottoms_conf, bottoms_ext, bottoms_price)]
     return tops, bottoms
 
 
+class DirectionalChange:
+    """
+    Streaming version of directional_change, fed one bar at a time.
+
+    The zig-zag state is a handful of scalars, so update() is O(1) and snapshot() / restore() let a live process
+    resume from where it stopped without replaying the history.
+    """
+
+    def __init__(self, sigma: float):
+        self.sigma = sigma
+
+        self._i = 0  # Index of the next bar
+        self._up_zig = True  # Last extreme is a bottom. Next is a top.
+        self._tmp_max = np.nan
+        self._tmp_min = np.nan
+        self._tmp_max_i = 0
+        self._tmp_min_i = 0
+
+    def update(self, close: float, high: float, low: float) -> list | None:
+        """
+        Processes the next bar.
+
+        :param close: Close of the bar.
+        :param high: High of the bar.
+        :param low: Low of the bar.
+        :return: None, or the extreme confirmed by this bar as [conf_i, ext_i, ext_p, type] with type 1 for a top and
+        -1 for a bottom, same columns as get_extremes.
+        """
+        i = self._i
+        self._i += 1
+        if i == 0:
+            self._tmp_max = high
+            self._tmp_min = low
+
+        if self._up_zig:  # Last extreme is a bottom
+            if high > self._tmp_max:
+                # New high, update
+                self._tmp_max = high
+                self._tmp_max_i = i
+            elif close < self._tmp_max - self._tmp_max * self.sigma:
+                # Price retraced by sigma %. Top confirmed
+                top = [i, self._tmp_max_i, self._tmp_max, 1]
+
+                # Setup for next bottom
+                self._up_zig = False
+                self._tmp_min = low
+                self._tmp_min_i = i
+                return top
+        else:  # Last extreme is a top
+            if low < self._tmp_min:
+                # New low, update
+                self._tmp_min = low
+                self._tmp_min_i = i
+            elif close > self._tmp_min + self._tmp_min * self.sigma:
+                # Price retraced by sigma %. Bottom confirmed
+                bottom = [i, self._tmp_min_i, self._tmp_min, -1]
+
+                # Setup for next top
+                self._up_zig = True
+                self._tmp_max = high
+                self._tmp_max_i = i
+                return bottom
+
+        return None
+
+    def snapshot(self) -> dict:
+        """:return: The full state as a dict of plain python values, suitable for json."""
+        return {
+            'sigma': float(self.sigma),
+            'i': self._i,
+            'up_zig': self._up_zig,
+            'tmp_max': float(self._tmp_max),
+            'tmp_min': float(self._tmp_min),
+            'tmp_max_i': self._tmp_max_i,
+            'tmp_min_i': self._tmp_min_i,
+        }
+
+    @classmethod
+    def restore(cls, state: dict) -> 'DirectionalChange':
+        """:return: A detector continuing from a snapshot, the next update is bar state['i']."""
+        dc = cls(state['sigma'])
+        dc._i = state['i']
+        dc._up_zig = state['up_zig']
+        dc._tmp_max = state['tmp_max']
+        dc._tmp_min = state['tmp_min']
+        dc._tmp_max_i = state['tmp_max_i']
+        dc._tmp_min_i = state['tmp_min_i']
+        return dc
+
+
+def directional_change_multi(close: np.array, high: np.array, low: np.array, sigmas: list[float],
+                             structured: bool = False) -> list[tuple]:
+    """
+    Runs directional_change for several sigmas. The prices are converted to python lists once and shared by the
+    per-sigma loops, which index lists much faster than arrays or Series.
+
+    :param close: Close prices.
+    :param high: High prices.
+    :param low: Low prices.
+    :param sigmas: Retracement thresholds.
+    :param structured: Return EXTREMES_DTYPE structured arrays instead of lists of lists.
+    :return: One (tops, bottoms) pair per sigma, same extremes as directional_change(close, high, low, sigma).
+    """
+    close, high, low = (np.asarray(values, dtype=np.float64).tolist() for values in (close, high, low))
+    return [directional_change(close, high, low, sigma, structured) for sigma in sigmas]
+
+
+def _stack_bars(series, lengths: np.array, order: np.array) -> np.array:
+    """:return: (bars x symbols) float64 array with the symbols in order, shorter symbols are padded with NaN."""
+    if isinstance(series, np.ndarray) and series.ndim == 2:
+        stacked = series.astype(np.float64, copy=False)[order]
+    else:
+        stacked = np.full((len(order), int(lengths.max(initial=0))), np.nan)
+        for row, symbol_i in enumerate(order):
+            stacked[row, :lengths[symbol_i]] = series[symbol_i]
+    return np.ascontiguousarray(stacked.T)
+
+
+def directional_change_batch(close, high, low, sigma, structured: bool = False) -> list[tuple]:
+    """
+    Runs directional_change for a universe of symbols, stepping the state machines of all symbols together with
+    array operations.
+
+    Symbols are ordered by length so that bar i only touches the symbols that have an i-th bar, the cost is linear
+    in the total number of bars.
+
+    :param close: Close prices, (symbols x bars) array or list of per-symbol arrays of any length.
+    :param high: High prices, same layout as close.
+    :param low: Low prices, same layout as close.
+    :param sigma: Retracement threshold, scalar or one per symbol.
+    :param structured: Return EXTREMES_DTYPE structured arrays instead of lists of lists.
+    :return: One (tops, bottoms) pair per symbol, same extremes as directional_change on that symbol alone.
+    """
+    lengths = np.array([len(values) for values in close], dtype=np.int64)
+    n_symbols = len(lengths)
+    sigma = np.broadcast_to(np.asarray(sigma, dtype=np.float64), (n_symbols,))
+
+    # Longest symbols first, the symbols with a bar at index i are then always a prefix
+    order = np.argsort(-lengths, kind='stable')
+    close, high, low = (_stack_bars(values, lengths, order) for values in (close, high, low))
+    sigma = sigma[order]
+    n_active = np.searchsorted(-lengths[order], -np.arange(close.shape[0]), side='right')
+
+    # Only the pending extreme matters, the running max while up_zig and the running min otherwise. Its price is
+    # always high / low at its index, so the bars only record which symbols updated and confirmed it.
+    n_bars = close.shape[0]
+    up_zig = np.ones(n_symbols, dtype=bool)  # Last extreme is a bottom. Next is a top.
+    tmp_p = high[0].copy() if n_bars else np.zeros(0)
+    updated = np.zeros((n_bars, n_symbols), dtype=bool)
+    confirmed = np.zeros((n_bars, n_symbols), dtype=bool)
+
+    for i in range(n_bars):
+        a = n_active[i]
+        up, p, c, h, lo = up_zig[:a], tmp_p[:a], close[i, :a], high[i, :a], low[i, :a]
+        retrace = p * sigma[:a]
+        new_ext = np.where(up, h > p, lo < p)
+        conf = np.logical_and(np.where(up, c < p - retrace, c > p + retrace), ~new_ext, out=confirmed[i, :a])
+
+        # New extreme, update. Or extreme confirmed, setup for the next one from the current bar
+        np.logical_xor(up, conf, out=up)
+        update = np.logical_or(new_ext, conf, out=updated[i, :a])
+        np.copyto(p, np.where(up, h, lo), where=update)
+
+    # Events of each symbol in confirmation order, starting with a top and alternating
+    symbols, conf_i = np.nonzero(confirmed.T)
+    bounds = np.searchsorted(symbols, np.arange(n_symbols + 1))
+    is_top = (np.arange(len(symbols)) - bounds[symbols]) % 2 == 0
+
+    # The extreme is the last update before its confirmation, or the first bar of the symbol if there is none
+    updates = np.concatenate([[-1], np.flatnonzero(updated.T)])
+    ext_i = updates[np.searchsorted(updates, symbols * n_bars + conf_i) - 1] - symbols * n_bars
+    ext_i = np.maximum(ext_i, 0)
+    ext_p = np.where(is_top, high[ext_i, symbols], low[ext_i, symbols])
+
+    results = [None] * n_symbols
+    for symbol_i in range(n_symbols):
+        start, stop = bounds[symbol_i], bounds[symbol_i + 1]
+        tops, bottoms = slice(start, stop, 2), slice(start + 1, stop, 2)
+        tops = extremes_array(conf_i[tops], ext_i[tops], ext_p[tops])
+        bottoms = extremes_array(conf_i[bottoms], ext_i[bottoms], ext_p[bottoms])
+        if not structured:
+            tops, bottoms = [list(top) for top in tops.tolist()], [list(bottom) for bottom in bottoms.tolist()]
+        results[order[symbol_i]] = (tops, bottoms)
+
+    return results
+
+
+def _extremes_frame(tops: np.ndarray, bottoms: np.ndarray) -> pd.DataFrame:
+    # Extremes of both types sorted by confirmation index, built from the columns directly
+    extremes = np.concatenate([tops, bottoms])
+    types = np.concatenate([np.ones(len(tops), dtype=np.int64), np.full(len(bottoms), -1, dtype=np.int64)])
+    order = np.argsort(extremes['conf_i'], kind='stable')
+    return pd.DataFrame({
+        'ext_i': extremes['ext_i'][order],
+        'ext_p': extremes['ext_p'][order],
+        'type': types[order],
+    }, index=pd.Index(extremes['conf_i'][order], name='conf_i'), copy=False)
+
+
 def get_extremes(ohlc: pd.DataFrame, sigma: float):
-    tops, bottoms = directional_change(ohlc['close'], ohlc['high'], ohlc['low'], sigma)
-    tops = pd.DataFrame(tops, columns=['conf_i', 'ext_i', 'ext_p'])
-    bottoms = pd.DataFrame(bottoms, columns=['conf_i', 'ext_i', 'ext_p'])
-    tops['type'] = 1
-    bottoms['type'] = -1
-    extremes = pd.concat([tops, bottoms])
-    extremes = extremes.set_index('conf_i')
-    extremes = extremes.sort_index()
-    return extremes
+    # Pull the columns out once as float64, the per-bar loop indexes python lists much faster than pandas Series
+    close, high, low = (ohlc[column].to_numpy(dtype=np.float64).tolist() for column in ['close', 'high', 'low'])
+    tops, bottoms = directional_change(close, high, low, sigma, structured=True)
+    return _extremes_frame(tops, bottoms)
+
+
+def get_extremes_multi(ohlc: pd.DataFrame, sigmas: list[float]) -> list[pd.DataFrame]:
+    """:return: [get_extremes(ohlc, sigma) for sigma in sigmas], with the columns converted once for all sigmas."""
+    extremes = directional_change_multi(ohlc['close'], ohlc['high'], ohlc['low'], sigmas, structured=True)
+    return [_extremes_frame(tops, bottoms) for tops, bottoms in extremes]
 
 
 def main():
@@ -0,0 +1,35 @@
+"""Columnar tables of confirmed extremes shared by the extreme detectors."""
+import numpy as np
+
+# Columnar layout of an extremes table, one record per confirmed extreme:
+# conf_i = confirmation index, ext_i = index of the extreme, ext_p = price of the extreme
+EXTREMES_DTYPE = np.dtype([('conf_i', np.int64), ('ext_i', np.int64), ('ext_p', np.float64)])
+
+
+def extremes_array(conf_i, ext_i, ext_p) -> np.ndarray:
+    """
+    Packs extremes columns into a structured array.
+
+    :param conf_i: Confirmation indices.
+    :param ext_i: Indices of the extremes.
+    :param ext_p: Prices of the extremes.
+    :return: Structured array with EXTREMES_DTYPE. pd.DataFrame(result) gives the conf_i, ext_i, ext_p columns.
+    """
+    extremes = np.empty(len(conf_i), dtype=EXTREMES_DTYPE)
+    extremes['conf_i'] = conf_i
+    extremes['ext_i'] = ext_i
+    extremes['ext_p'] = ext_p
+    return extremes
+
+
+def rolling_extremes_array(data: np.array, confirmed: np.array, order: int) -> np.ndarray:
+    """
+    Extremes table of a rolling window mask, the extreme is `order` bars before its confirmation.
+
+    :param data: np.array of price data.
+    :param confirmed: Boolean mask of confirmation indices.
+    :param order: Number of bars between the extreme and its confirmation.
+    :return: Structured array with EXTREMES_DTYPE.
+    """
+    conf_i = np.flatnonzero(confirmed)
+    return extremes_array(conf_i, conf_i - order, np.asarray(data)[conf_i - order])
@@ -3,7 +3,7 @@ import numpy as np
 import matplotlib.pyplot as plt
 import mplfinance as mpf
 from perceptually_important import find_pips
-from rolling_window import rw_top, rw_bottom
+from rolling_window import RollingExtremaDetector, RollingExtremaIndex, rw_extreme_flags
 from trendline_automation import fit_trendlines_single
 from dataclasses import dataclass
 
@@ -194,7 +194,10 @@ def check_bull_pattern_pips(pending: FlagPattern, data: np.array, i: int, order:
     return True
 
 
-def find_flags_pennants_pips(data: np.array, order: int):
+def find_flags_pennants_pips(data: np.array, order: int, detector: RollingExtremaDetector | None = None,
+                             index: RollingExtremaIndex | None = None):
+    # detector: optional streaming extrema detector of the same order, fed one bar at a time
+    # index: optional multi-order extrema index built on the same data, shared across an order sweep
     assert (order >= 3)
     pending_bull = None  # Pending pattern
     pending_bear = None  # Pending pattern
@@ -203,13 +206,13 @@ def find_flags_pennants_pips(data: np.array, order: int):
     bear_pennants = []
     bull_flags = []
     bear_flags = []
-    for i in range(len(data)):
+    for i, (is_top, is_bottom) in enumerate(rw_extreme_flags(data, order, detector, index)):
 
         # Pattern data is organized like so:
-        if rw_top(data, i, order):
+        if is_top:
             pending_bear = FlagPattern(i - order, data[i - order])
 
-        if rw_bottom(data, i, order):
+        if is_bottom:
             pending_bull = FlagPattern(i - order, data[i - order])
 
         if pending_bear is not None:
@@ -333,7 +336,8 @@ def check_bear_pattern_trendline(pending: FlagPattern, data: np.array, i: int, o
     return True
 
 
-def find_flags_pennants_trendline(data: np.array, order: int):
+def find_flags_pennants_trendline(data: np.array, order: int, index: RollingExtremaIndex | None = None):
+    # index: optional multi-order extrema index built on the same data, shared across an order sweep
     assert (order >= 3)
     pending_bull = None  # Pending pattern
     pending_bear = None  # Pending pattern
@@ -345,10 +349,10 @@ def find_flags_pennants_trendline(data: np.array, order: int):
     bear_pennants = []
     bull_flags = []
     bear_flags = []
-    for i in range(len(data)):
+    for i, (is_top, is_bottom) in enumerate(rw_extreme_flags(data, order, index=index)):
 
         # Pattern data is organized like so:
-        if rw_top(data, i, order):
+        if is_top:
             last_top = i - order
             if last_bottom != -1:
                 pending = FlagPattern(last_bottom, data[last_bottom])
@@ -356,7 +360,7 @@ def find_flags_pennants_trendline(data: np.array, order: int):
                 pending.tip_y = data[last_top]
                 pending_bull = pending
 
-        if rw_bottom(data, i, order):
+        if is_bottom:
             last_bottom = i - order
             if last_top != -1:
                 pending = FlagPattern(last_top, data[last_top])
@@ -7,7 +7,7 @@ import mplfinance as mpf
 import numpy as np
 import pandas as pd
 
-from directional_change import get_extremes
+from directional_change import get_extremes_multi
 
 
 @dataclass
@@ -141,14 +141,24 @@ def find_xabcd(ohlc: pd.DataFrame, extremes: pd.DataFrame, err_thresh: float = 0
         }
         output[pat.name] = pat_data
 
-    first_conf = extremes.index[0]
+    # Pull the columns out once, per-bar pandas row lookups dominate the runtime otherwise
+    conf_idx = extremes.index.to_numpy()
+    ext_types = extremes['type'].to_numpy()
+    ext_idx = extremes['ext_i'].to_numpy()
+    ext_prices = extremes['ext_p'].to_numpy()
+    seg_heights = extremes['seg_height'].to_numpy()
+    retrace_ratios = extremes['retrace_ratio'].to_numpy()
+    lows = ohlc['low'].to_numpy()
+    highs = ohlc['high'].to_numpy()
+
+    first_conf = conf_idx[0]
     extreme_i = 0
 
     entry_taken = 0
     pattern_used = None
     for i in range(first_conf, len(ohlc)):
 
-        if extremes.index[extreme_i + 1] == i:
+        if conf_idx[extreme_i + 1] == i:
             entry_taken = 0
             extreme_i += 1
 
@@ -165,35 +175,34 @@ def find_xabcd(ohlc: pd.DataFrame, extremes: pd.DataFrame, err_thresh: float = 0
         if extreme_i < 3:
             continue
 
-        ext_type = extremes.iloc[extreme_i]['type']
-        last_conf_i = extremes.index[extreme_i]
+        ext_type = ext_types[extreme_i]
+        last_conf_i = conf_idx[extreme_i]
 
-        if extremes.iloc[extreme_i]['type'] > 0.0:
+        if ext_type > 0.0:
             # Last extreme was a top, meaning we're on a leg down currently.
             # We are checking for bull patterns
-            D_price = ohlc.iloc[i]['low']
+            D_price = lows[i]
             # Check that the current low is the lowest since last confirmed top
-            if ohlc.iloc[last_conf_i:i]['low'].min() < D_price:
+            if last_conf_i < i and np.nanmin(lows[last_conf_i:i]) < D_price:
                 continue
         else:
             # Last extreme was a bottom, meaning we're on a leg up currently.
             # We are checking for bear patterns
-            D_price = ohlc.iloc[i]['high']
+            D_price = highs[i]
             # Check that the current high is the highest since last confirmed bottom
-            if ohlc.iloc[last_conf_i:i]['high'].max() > D_price:
+            if last_conf_i < i and np.nanmax(highs[last_conf_i:i]) > D_price:
                 continue
 
         # D_Price set, get ratios
-        dc_retrace = abs(D_price - extremes.iloc[extreme_i]['ext_p']) / extremes.iloc[extreme_i]['seg_height']
-        xa_ad_retrace = abs(D_price - extremes.iloc[extreme_i - 2]['ext_p']) / extremes.iloc[extreme_i - 2][
-            'seg_height']
+        dc_retrace = abs(D_price - ext_prices[extreme_i]) / seg_heights[extreme_i]
+        xa_ad_retrace = abs(D_price - ext_prices[extreme_i - 2]) / seg_heights[extreme_i - 2]
 
         best_err = 1e30
         best_pat = None
         for pat in ALL_PATTERNS:
             err = 0.0
-            err += get_error(extremes.iloc[extreme_i]['retrace_ratio'], pat.AB_BC)
-            err += get_error(extremes.iloc[extreme_i - 1]['retrace_ratio'], pat.XA_AB)
+            err += get_error(retrace_ratios[extreme_i], pat.AB_BC)
+            err += get_error(retrace_ratios[extreme_i - 1], pat.XA_AB)
             err += get_error(dc_retrace, pat.BC_CD)
             err += get_error(xa_ad_retrace, pat.XA_AD)
             if err < best_err:
@@ -202,10 +211,10 @@ def find_xabcd(ohlc: pd.DataFrame, extremes: pd.DataFrame, err_thresh: float = 0
 
         if best_err <= err_thresh:
             pattern_data = XABCDFound(
-                int(extremes.iloc[extreme_i - 3]['ext_i']),
-                int(extremes.iloc[extreme_i - 2]['ext_i']),
-                int(extremes.iloc[extreme_i - 1]['ext_i']),
-                int(extremes.iloc[extreme_i]['ext_i']),
+                int(ext_idx[extreme_i - 3]),
+                int(ext_idx[extreme_i - 2]),
+                int(ext_idx[extreme_i - 1]),
+                int(ext_idx[extreme_i]),
                 i,
                 best_err, best_pat, True
             )
@@ -237,9 +246,7 @@ def main():
     data['r'] = np.log(data['close']).diff().shift(-1)
     all_combined = np.zeros(len(data))
     sigmas = [0.01, 0.015, 0.02, 0.025, 0.03, 0.035, 0.04]
-    for sigma in sigmas:
-
-        extremes = get_extremes(data, sigma)
+    for sigma, extremes in zip(sigmas, get_extremes_multi(data, sigmas)):  # Columns converted once for all sigmas
         output = find_xabcd(data, extremes, 0.5)
         sig = np.zeros(len(data))
         for pat in ALL_PATTERNS:
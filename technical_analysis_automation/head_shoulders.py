@@ -6,7 +6,7 @@ import mplfinance as mpf
 import numpy as np
 import pandas as pd
 
-from rolling_window import rw_top, rw_bottom
+from rolling_window import RollingExtremaDetector, RollingExtremaIndex, rw_extreme_flags
 
 
 @dataclass(slots=True)
@@ -188,7 +188,8 @@ def check_hs(extrema_indices: list[int], data: np.array, i: int, early_find: boo
     return pattern
 
 
-def find_patterns(data: np.array, order: int = 6, early_find: bool = False):
+def find_patterns(data: np.array, order: int = 6, early_find: bool = False,
+                  detector: RollingExtremaDetector | None = None, index: RollingExtremaIndex | None = None):
     """
     Identifies potential Head and Shoulders (regular and inverted) patterns in the given data.
 
@@ -198,6 +199,9 @@ def find_patterns(data: np.array, order: int = 6, early_find: bool = False):
     :param early_find: Whether to detect patterns early before confirmation by price breaking the neckline. Setting to
     False means waiting until the pattern is fully formed to detect it, but can result in missing the opportunity to
     get in.
+    :param detector: Optional streaming extrema detector of the same order to source the local tops and bottoms from,
+    fed one bar at a time as the data is scanned.
+    :param index: Optional multi-order extrema index built on the same data, shared across calls in order sweeps.
     :return: A tuple containing lists of identified regular and inverted Head and Shoulders patterns.
     """
     assert (order >= 1), "Order must be at least 1."
@@ -212,15 +216,15 @@ def find_patterns(data: np.array, order: int = 6, early_find: bool = False):
 
     ihs_patterns = []  # Inverted (bullish)
     hs_patterns = []  # Regular (bearish)
-    for i in range(len(data)):
+    for i, (is_top, is_bottom) in enumerate(rw_extreme_flags(data, order, detector, index)):
 
-        if rw_top(data, i, order):
+        if is_top:
             recent_extrema.append(i - order)
             recent_types.append(1)
             ihs_lock = False
             last_is_top = True
 
-        if rw_bottom(data, i, order):
+        if is_bottom:
             recent_extrema.append(i - order)
             recent_types.append(-1)
             hs_lock = False
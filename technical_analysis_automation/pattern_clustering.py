@@ -0,0 +1,165 @@
+"""K-means clustering of PIP patterns, with silhouette scoring to pick the number of clusters."""
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+
+def _sq_distances(points: np.array, centers: np.array) -> np.array:
+    """:return: (n_points x n_centers) squared euclidean distances."""
+    sq = (points ** 2).sum(axis=1)[:, None] - 2.0 * points @ centers.T + (centers ** 2).sum(axis=1)[None, :]
+    return np.maximum(sq, 0.0, out=sq)
+
+
+def kmeans_plusplus(points: np.array, k: int, rng: np.random.Generator, n_candidates: int = 3) -> np.array:
+    """
+    Greedy k-means++ seeding. Each new center is the best of n_candidates points drawn with probability proportional
+    to their squared distance to the closest center so far.
+
+    :param points: (n_points x dim) float array.
+    :param k: Number of centers.
+    :param rng: Random generator, the only source of randomness.
+    :param n_candidates: Candidates drawn per center.
+    :return: (k x dim) array of initial centers.
+    """
+    n = len(points)
+    centers = np.empty((k, points.shape[1]))
+    centers[0] = points[rng.integers(n)]
+    closest = _sq_distances(points, centers[:1])[:, 0]
+    for c in range(1, k):
+        total = closest.sum()
+        if total > 0.0:
+            candidates = rng.choice(n, size=min(n_candidates, n), p=closest / total)
+        else:  # Every point is on a center already
+            candidates = rng.integers(n, size=1)
+
+        # Keep the candidate that leaves the smallest total squared distance
+        candidate_closest = np.minimum(closest[None, :], _sq_distances(points, points[candidates]).T)
+        best = candidate_closest.sum(axis=1).argmin()
+        centers[c] = points[candidates[best]]
+        closest = candidate_closest[best]
+
+    return centers
+
+
+def kmeans(points: np.array, centers: np.array, tolerance: float = 0.001, itermax: int = 100) -> tuple:
+    """
+    Lloyd's k-means with squared euclidean distance. Clusters left without points are dropped, so fewer clusters than
+    initial centers can come back.
+
+    :param points: (n_points x dim) float array.
+    :param centers: (k x dim) initial centers.
+    :param tolerance: Stop when no center moves by more than this squared distance.
+    :param itermax: Maximum number of iterations.
+    :return: labels (n_points int array of cluster indices) and (n_clusters x dim) centers.
+    """
+    centers = np.array(centers, dtype=np.float64)
+    labels = np.zeros(len(points), dtype=np.int64)
+    for _ in range(itermax):
+        labels = _sq_distances(points, centers).argmin(axis=1)
+        counts = np.bincount(labels, minlength=len(centers))
+        if (counts == 0).any():
+            # Drop empty clusters and renumber the others
+            kept = np.flatnonzero(counts)
+            labels = np.searchsorted(kept, labels)
+            centers, counts = centers[kept], counts[kept]
+
+        updated = np.stack([np.bincount(labels, points[:, j], len(centers)) for j in range(points.shape[1])], axis=1)
+        updated /= counts[:, None]
+        change = ((updated - centers) ** 2).sum(axis=1).max()
+        centers = updated
+        if change <= tolerance:
+            break
+
+    labels = _sq_distances(points, centers).argmin(axis=1)
+    return labels, centers
+
+
+def silhouette_score(points: np.array, labels: np.array, sample_size: int | None = None,
+                     rng: np.random.Generator | None = None, block_size: int = 512) -> float:
+    """
+    Mean silhouette of a clustering, with squared euclidean distance. Points alone in their cluster score 0.
+
+    The exact score is O(n^2). With sample_size the mean is taken over that many randomly drawn points, each still
+    measured against every point, which is an unbiased estimate at O(sample_size * n).
+
+    :param points: (n_points x dim) float array.
+    :param labels: Cluster index of every point.
+    :param sample_size: Number of points to average over, None for all of them.
+    :param rng: Random generator used to draw the sample.
+    :param block_size: Points scored together, bounds the (block_size x n_points) distance matrix.
+    :return: Mean silhouette in [-1, 1], NaN with fewer than two clusters.
+    """
+    n_clusters = labels.max() + 1 if len(labels) else 0
+    if n_clusters < 2:
+        return np.nan
+
+    scored = np.arange(len(points))
+    if sample_size is not None and sample_size < len(points):
+        scored = np.sort((rng or np.random.default_rng()).choice(len(points), size=sample_size, replace=False))
+
+    counts = np.bincount(labels, minlength=n_clusters).astype(np.float64)
+    one_hot = np.zeros((len(points), n_clusters))
+    one_hot[np.arange(len(points)), labels] = 1.0
+
+    scores = np.empty(len(scored))
+    for start in range(0, len(scored), block_size):
+        block = scored[start:start + block_size]
+        own = labels[block]
+        rows = np.arange(len(block))
+
+        # Sum of distances to the members of every cluster
+        cluster_sums = _sq_distances(points[block], points) @ one_hot
+        with np.errstate(divide='ignore', invalid='ignore'):
+            a = cluster_sums[rows, own] / (counts[own] - 1.0)
+            mean_to = cluster_sums / counts
+        mean_to[rows, own] = np.inf
+        b = mean_to.min(axis=1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s = (b - a) / np.maximum(a, b)
+        s[counts[own] == 1] = 0.0
+        scores[start:start + len(block)] = np.nan_to_num(s)
+
+    return float(scores.mean())
+
+
+def _silhouette_for_k(points: np.array, k: int, seed: np.random.SeedSequence, sample_size: int | None) -> float:
+    # Clusters points into k clusters and scores them, NaN if some clusters came back empty
+    rng = np.random.default_rng(seed)
+    labels, centers = kmeans(points, kmeans_plusplus(points, k, rng))
+    if len(centers) != k:
+        return np.nan
+    return silhouette_score(points, labels, sample_size, rng)
+
+
+def silhouette_ksearch(points: np.array, kmin: int, kmax: int, seed: int | np.random.SeedSequence | None = None,
+                       n_jobs: int = 1, sample_size: int | None = None) -> tuple[int, dict]:
+    """
+    Finds the number of clusters with the best mean silhouette, trying every k in range(kmin, kmax).
+
+    Every k gets its own child of the seed, so the result does not depend on n_jobs or on the order the candidates
+    finish in.
+
+    :param points: (n_points x dim) float array.
+    :param kmin: Smallest number of clusters, at least 2.
+    :param kmax: One more than the largest number of clusters.
+    :param seed: Seed or SeedSequence of the k-means++ seeding and silhouette sampling.
+    :param n_jobs: Worker processes evaluating candidates in parallel, 1 runs them in this process.
+    :param sample_size: Estimate silhouettes from this many points, see silhouette_score.
+    :return: Best k and the score of every k.
+    """
+    points = np.ascontiguousarray(points, dtype=np.float64)
+    if kmin < 2 or kmax > len(points):
+        raise ValueError(f"Need 2 <= kmin and kmax <= {len(points)} points, got kmin={kmin} kmax={kmax}")
+
+    ks = list(range(kmin, kmax))
+    seeds = (seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)).spawn(len(ks))
+    if n_jobs == 1:
+        scores = [_silhouette_for_k(points, k, s, sample_size) for k, s in zip(ks, seeds, strict=True)]
+    else:
+        with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+            scores = list(pool.map(_silhouette_for_k, [points] * len(ks), ks, seeds, [sample_size] * len(ks)))
+
+    scores = dict(zip(ks, scores, strict=True))
+    best = max(ks, key=lambda k: -np.inf if np.isnan(scores[k]) else scores[k])
+    return best, scores
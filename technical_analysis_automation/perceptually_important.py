@@ -1,8 +1,38 @@
+import bisect
+import heapq
+
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 
 
+def _segment_distances(data: np.array, x_l: int, y_l: float, x_r: int, y_r: float, dist_measure: int) -> np.array:
+    """
+    Distances of the bars strictly between two adjacent PIPs to the segment joining them.
+
+    :return: Distance of data[i] for i in range(x_l + 1, x_r), NaN distances are returned as 0 so they never win.
+    """
+    if x_r <= x_l + 1:
+        return np.zeros(0)
+
+    i = np.arange(x_l + 1, x_r)
+    y = data[x_l + 1:x_r]
+    if dist_measure == 1:  # Euclidean distance
+        d = np.sqrt((x_l - i) ** 2 + (y_l - y) ** 2)
+        d += np.sqrt((x_r - i) ** 2 + (y_r - y) ** 2)
+    else:
+        slope = (y_r - y_l) / (x_r - x_l)
+        intercept = y_l - x_l * slope
+        d = slope * i
+        d += intercept
+        d -= y
+        np.abs(d, out=d)
+        if dist_measure == 2:  # Perpendicular distance
+            d /= (slope ** 2 + 1) ** 0.5
+
+    return np.fmax(d, 0.0, out=d)
+
+
 def find_pips(data: np.array, n_pips: int, dist_measure: int):
     # dist_measure
     # 1 = Euclidean Distance
@@ -12,43 +42,242 @@ def find_pips(data: np.array, n_pips: int, dist_measure: int):
     pips_x = [0, len(data) - 1]  # Index
     pips_y = [data[0], data[-1]]  # Price
 
-    for curr_point in range(2, n_pips):
+    # Distance of every bar to the segment between its adjacent PIPs, -1 for the PIPs themselves. Only the two
+    # segments split by a new PIP change, the first bar with the largest distance is the next PIP.
+    dist = np.full(len(data), -1.0)
+    dist[1:-1] = _segment_distances(data, pips_x[0], pips_y[0], pips_x[1], pips_y[1], dist_measure)
+
+    for _ in range(2, n_pips):
+        md_i = int(dist.argmax())
+        if not dist[md_i] > 0.0:
+            # Every remaining bar is on its segment, finish like the scalar search
+            return _find_pips_without_distance(data, pips_x, pips_y, n_pips, dist_measure)
+
+        insert_index = bisect.bisect(pips_x, md_i)
+        pips_x.insert(insert_index, md_i)
+        pips_y.insert(insert_index, data[md_i])
+
+        dist[md_i] = -1.0
+        for k in (insert_index - 1, insert_index):
+            x_l, x_r = pips_x[k], pips_x[k + 1]
+            dist[x_l + 1:x_r] = _segment_distances(data, x_l, pips_y[k], x_r, pips_y[k + 1], dist_measure)
+
+    return pips_x, pips_y
 
+
+def _find_pips_without_distance(data: np.array, pips_x: list, pips_y: list, n_pips: int, dist_measure: int):
+    # With no bar at a positive distance the scalar search inserts index -1 before the last PIP, after which the PIPs
+    # are no longer sorted. Keep searching every adjacent pair in order so the result stays the same.
+    for curr_point in range(len(pips_x), n_pips):
         md = 0.0  # Max distance
         md_i = -1  # Max distance index
         insert_index = -1
-
         for k in range(0, curr_point - 1):
+            d = _segment_distances(data, pips_x[k], pips_y[k], pips_x[k + 1], pips_y[k + 1], dist_measure)
+            if len(d) and d.max() > md:
+                md = d.max()
+                md_i = pips_x[k] + 1 + int(d.argmax())
+                insert_index = k + 1
+
+        pips_x.insert(insert_index, md_i)
+        pips_y.insert(insert_index, data[md_i])
+
+    return pips_x, pips_y
+
+
+def _push_farthest(heap: list, data: np.array, x_l: int, x_r: int, dist_measure: int):
+    # Pushes the farthest bar from the segment between x_l and x_r, first one on ties, if it is off the segment
+    d = _segment_distances(data, x_l, data[x_l], x_r, data[x_r], dist_measure)
+    if len(d):
+        j = int(d.argmax())
+        if d[j] > 0.0:
+            heapq.heappush(heap, (-float(d[j]), x_l + 1 + j, x_l, x_r))
+
+
+def rank_pips(data: np.array, dist_measure: int) -> np.array:
+    """
+    Ranks every bar by the order in which find_pips inserts it, the first n_pips of the ranking are the PIPs of
+    find_pips(data, n_pips, dist_measure) for every n_pips.
+
+    A heap holds the farthest bar of each segment. Inserting a PIP pops it and pushes the farthest bars of the two
+    segments it splits, so ranking all bars takes O(n log n) for typical price data.
 
-            # Left adjacent, right adjacent indices
-            left_adj = k
-            right_adj = k + 1
+    :param data: np.array of price data.
+    :param dist_measure: Same as find_pips.
+    :return: int64 array of the indices of data in insertion order, starting with the first and last bar. Bars that
+    are on their segment (zero or NaN distance) are never picked by find_pips, they are ranked last in index order.
+    """
+    n = len(data)
+    ranking = [0, n - 1] if n > 1 else list(range(n))
+    heap = []
+    if n > 2:
+        _push_farthest(heap, data, 0, n - 1, dist_measure)
 
-            time_diff = pips_x[right_adj] - pips_x[left_adj]
-            price_diff = pips_y[right_adj] - pips_y[left_adj]
-            slope = price_diff / time_diff
-            intercept = pips_y[left_adj] - pips_x[left_adj] * slope;
+    while heap:
+        _, md_i, x_l, x_r = heapq.heappop(heap)
+        ranking.append(md_i)
+        _push_farthest(heap, data, x_l, md_i, dist_measure)
+        _push_farthest(heap, data, md_i, x_r, dist_measure)
 
-            for i in range(pips_x[left_adj] + 1, pips_x[right_adj]):
+    ranked = np.zeros(n, dtype=bool)
+    ranked[ranking] = True
+    return np.concatenate([np.array(ranking, dtype=np.int64), np.flatnonzero(~ranked)])
 
-                d = 0.0  # Distance
+
+def pips_from_ranking(data: np.array, ranking: np.array, n_pips: int):
+    """
+    :param data: np.array of price data the ranking was computed on.
+    :param ranking: Output of rank_pips.
+    :param n_pips: Number of PIPs.
+    :return: pips_x, pips_y of the first n_pips ranked bars, same layout as find_pips.
+    """
+    pips_x = np.sort(ranking[:n_pips]).tolist()
+    return pips_x, [data[x] for x in pips_x]
+
+
+class SlidingWindowPIPs:
+    """
+    PIPs of overlapping windows of one price array, such as the lookback windows of PIPPatternMiner.
+
+    Consecutive windows share all but one bar but not their endpoints, so every segment touching a window edge is
+    new. Segments between two interior PIPs often survive the slide, their farthest bar search is kept by absolute
+    (left, right) index and reused by later windows.
+
+    Cached searches measure bar positions from the left end of the segment, find_pips from the window start, which
+    can round differently. Whenever a pick is within rounding tolerance of another candidate or of zero the window is
+    handed to find_pips, so the PIPs are always the ones find_pips returns.
+    """
+
+    def __init__(self, data: np.array, n_pips: int, dist_measure: int):
+        self._data = data
+        self._n_pips = n_pips
+        self._dist_measure = dist_measure
+
+        # Distances are O(lookback * price) before cancelling, rounding stays far below this per bar of window
+        self._tol_per_bar = 1e-13 * (float(np.nanmax(np.abs(data), initial=0.0)) + 1.0)
+
+        # (left, right) -> (max distance, index of the farthest bar, True if another bar is within tolerance of it)
+        self._segments = {}
+        self._by_left = {}  # left -> keys of _segments, to drop segments the window has passed
+        self._first_left = 0
+
+    def _farthest(self, left: int, right: int, tol: float) -> tuple:
+        key = (left, right)
+        found = self._segments.get(key)
+        if found is None:
+            d = _segment_distances(self._data[left:right + 1], 0, self._data[left], right - left, self._data[right],
+                                   self._dist_measure)
+            if len(d):
+                j = int(d.argmax())
+                md = float(d[j])
+                found = (md, left + 1 + j, int(np.count_nonzero(d >= md - tol)) > 1)
+            else:
+                found = (0.0, -1, False)
+            self._segments[key] = found
+            self._by_left.setdefault(left, []).append(key)
+        return found
+
+    def find(self, start_i: int, end_i: int):
+        """
+        :param start_i: First bar of the window.
+        :param end_i: Last bar of the window, inclusive.
+        :return: pips_x, pips_y of find_pips(data[start_i:end_i + 1], n_pips, dist_measure), pips_x are indices of
+        the full array.
+        """
+        # Segments left of the window are not needed by windows that keep sliding forward
+        while self._first_left < start_i:
+            for key in self._by_left.pop(self._first_left, []):
+                del self._segments[key]
+            self._first_left += 1
+
+        tol = self._tol_per_bar * (end_i - start_i + 1)
+        pips_x = [start_i, end_i]
+        candidates = [self._farthest(start_i, end_i, tol)]
+        for _ in range(2, self._n_pips):
+            # Segment with the farthest bar, first one on ties, and the farthest bar of all other segments
+            k, runner_up = 0, -np.inf
+            for seg in range(1, len(candidates)):
+                if candidates[seg][0] > candidates[k][0]:
+                    k, runner_up = seg, candidates[k][0]
+                else:
+                    runner_up = max(runner_up, candidates[seg][0])
+
+            md, md_i, tied = candidates[k]
+            if tied or md <= tol or runner_up >= md - tol:
+                window = self._data[start_i:end_i + 1]
+                pips_x, pips_y = find_pips(window, self._n_pips, self._dist_measure)
+                return [x + start_i for x in pips_x], pips_y
+
+            pips_x.insert(k + 1, md_i)
+            candidates[k:k + 1] = [self._farthest(pips_x[k], md_i, tol), self._farthest(md_i, pips_x[k + 2], tol)]
+
+        return pips_x, [self._data[x] for x in pips_x]
+
+
+def find_pips_batch(windows: np.array, n_pips: int, dist_measure: int, chunk_size: int = 4096):
+    """
+    find_pips for every row of a 2D stack of equal length windows, all rows searched together with array operations.
+
+    Each step finds the adjacent PIPs of every bar from the PIPs placed so far, measures all bars against their
+    segment in window coordinates like find_pips, and places the first farthest bar of each row. Rows where the
+    scalar search would find no bar off its segment, and perpendicular distance rows with a near tie (the divisor is
+    rounded differently from find_pips), are redone with find_pips.
+
+    :param windows: (n_windows x window length) array, e.g. np.lib.stride_tricks.sliding_window_view(data, lookback).
+    A zero-copy view is fine, windows are read chunk by chunk.
+    :param n_pips: Number of PIPs per window.
+    :param dist_measure: Same as find_pips.
+    :param chunk_size: Number of windows searched together, bounds the size of the temporary arrays.
+    :return: (n_windows x n_pips) int64 array of PIP indices within each window and float64 array of their prices.
+    """
+    n_windows, length = windows.shape
+    pips_x = np.zeros((n_windows, n_pips), dtype=np.int64)
+    cols = np.arange(length)
+    for start in range(0, n_windows, chunk_size):
+        y = np.asarray(windows[start:start + chunk_size], dtype=np.float64)
+        rows = np.arange(len(y))
+        chunk_x = pips_x[start:start + len(y)]
+        chunk_x[:, 1:] = length - 1
+
+        is_pip = np.zeros(y.shape, dtype=bool)
+        is_pip[:, [0, -1]] = True
+        redo = np.zeros(len(y), dtype=bool)
+        for curr_point in range(2, n_pips):
+            # Adjacent PIPs of every bar, a PIP is its own left and right PIP and is excluded below
+            x_l = np.maximum.accumulate(np.where(is_pip, cols, 0), axis=1)
+            x_r = np.minimum.accumulate(np.where(is_pip, cols, length - 1)[:, ::-1], axis=1)[:, ::-1]
+            y_l = np.take_along_axis(y, x_l, axis=1)
+            y_r = np.take_along_axis(y, x_r, axis=1)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
                 if dist_measure == 1:  # Euclidean distance
-                    d = ((pips_x[left_adj] - i) ** 2 + (pips_y[left_adj] - data[i]) ** 2) ** 0.5
-                    d += ((pips_x[right_adj] - i) ** 2 + (pips_y[right_adj] - data[i]) ** 2) ** 0.5
-                elif dist_measure == 2:  # Perpendicular distance
-                    d = abs((slope * i + intercept) - data[i]) / (slope ** 2 + 1) ** 0.5
-                else:  # Vertical distance
-                    d = abs((slope * i + intercept) - data[i])
-
-                if d > md:
-                    md = d
-                    md_i = i
-                    insert_index = right_adj
+                    d = np.sqrt((x_l - cols) ** 2 + (y_l - y) ** 2)
+                    d += np.sqrt((x_r - cols) ** 2 + (y_r - y) ** 2)
+                else:
+                    slope = (y_r - y_l) / (x_r - x_l)
+                    d = slope * cols
+                    d += y_l - x_l * slope
+                    d -= y
+                    np.abs(d, out=d)
+                    if dist_measure == 2:  # Perpendicular distance
+                        d /= np.sqrt(slope ** 2 + 1)
 
-        pips_x.insert(insert_index, md_i)
-        pips_y.insert(insert_index, data[md_i])
+            np.fmax(d, 0.0, out=d)
+            d[is_pip] = -1.0
+            md_i = d.argmax(axis=1)
+            md = d[rows, md_i]
+            redo |= ~(md > 0.0)
+            if dist_measure == 2:
+                redo |= np.count_nonzero(d >= (md * (1.0 - 1e-12))[:, None], axis=1) > 1
 
-    return pips_x, pips_y
+            chunk_x[:, curr_point] = md_i
+            is_pip[rows, md_i] = True
+
+        chunk_x.sort(axis=1)
+        for row in np.flatnonzero(redo):
+            chunk_x[row] = find_pips(y[row], n_pips, dist_measure)[0]
+
+    return pips_x, np.take_along_axis(np.asarray(windows, dtype=np.float64), pips_x, axis=1)
 
 
 def main():
@@ -1,23 +1,89 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from statistics import NormalDist
+
 import pandas as pd
 import numpy as np
 import math
 import matplotlib.pyplot as plt
 import mplfinance as mpf
-from pyclustering.cluster.silhouette import silhouette_ksearch_type, silhouette_ksearch
-from pyclustering.cluster.kmeans import kmeans
-from pyclustering.cluster.center_initializer import kmeans_plusplus_initializer
-from perceptually_important import find_pips
+from numpy.lib.stride_tricks import sliding_window_view
+from pattern_clustering import kmeans, kmeans_plusplus, silhouette_ksearch
+from perceptually_important import find_pips, find_pips_batch
+
+
+class PatternStore:
+    """
+    Growable storage of mined patterns: a preallocated (capacity x n_pips) float64 buffer of patterns and an int64
+    buffer of the data index each pattern ends at. Capacity doubles when full, so appending is amortized O(1).
+    """
+
+    def __init__(self, n_pips: int, capacity: int = 1024):
+        self._patterns = np.empty((capacity, n_pips), dtype=np.float64)
+        self._indices = np.empty(capacity, dtype=np.int64)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def patterns(self) -> np.array:
+        """(n_patterns x n_pips) view of the stored patterns, invalidated by the next append or extend."""
+        return self._patterns[:self._size]
+
+    @property
+    def indices(self) -> np.array:
+        """View of the data index of every stored pattern, invalidated by the next append or extend."""
+        return self._indices[:self._size]
+
+    def clear(self):
+        # Keeps the buffers for reuse
+        self._size = 0
+
+    def reserve(self, capacity: int):
+        if capacity <= len(self._indices):
+            return
+
+        patterns = np.empty((capacity, self._patterns.shape[1]), dtype=np.float64)
+        indices = np.empty(capacity, dtype=np.int64)
+        patterns[:self._size] = self.patterns
+        indices[:self._size] = self.indices
+        self._patterns, self._indices = patterns, indices
+
+    def append(self, pattern: np.array, index: int):
+        self.extend(np.asarray(pattern)[None, :], [index])
+
+    def extend(self, patterns: np.array, indices: np.array):
+        """
+        :param patterns: (n x n_pips) array of patterns.
+        :param indices: Data index each of the n patterns ends at.
+        """
+        end = self._size + len(indices)
+        if end > len(self._indices):
+            self.reserve(max(end, 2 * len(self._indices)))
+
+        self._patterns[self._size:end] = patterns
+        self._indices[self._size:end] = indices
+        self._size = end
 
 
 class PIPPatternMiner:
 
-    def __init__(self, n_pips: int, lookback: int, hold_period: int):
+    def __init__(self, n_pips: int, lookback: int, hold_period: int,
+                 seed: int | np.random.SeedSequence | None = None, n_jobs: int = 1,
+                 silhouette_sample: int | None = None):
+        # seed makes clustering and permutations reproducible, n_jobs worker processes search the number of
+        # clusters and run permutation reps, silhouette_sample estimates each silhouette from that many patterns
         self._n_pips = n_pips
         self._lookback = lookback
         self._hold_period = hold_period
 
-        self._unique_pip_patterns = []
-        self._unique_pip_indices = []
+        # Every clustering step and permutation rep spawns its own child seed
+        self._seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+        self._n_jobs = n_jobs
+        self._silhouette_sample = silhouette_sample
+
+        self._pattern_store = PatternStore(n_pips)  # Unique PIP patterns, z-score normalized, and their indices
         self._cluster_centers = []
         self._pip_clusters = []
 
@@ -30,18 +96,99 @@ class PIPPatternMiner:
         self._selected_long = []
         self._selected_short = []
 
+        # Cluster centers as a (n_clusters x n_pips) array and the signal of each cluster, used by predict
+        self._center_matrix = None
+        self._cluster_signal_map = None
+
         self._fit_martin = None
         self._perm_martins = []
+        self._perm_reps = None  # Permutation reps run by the last train, fewer than n_reps - 1 if stopped early
+        self._perm_pvalue = None
 
         self._data = None  # Array of log closing prices to mine patterns
+        self._data_fingerprint = None  # data_fingerprint of the array passed to train
         self._returns = None  # Array of next log returns, concurrent with _data
 
+    @property
+    def _unique_pip_patterns(self) -> np.array:
+        return self._pattern_store.patterns
+
+    @property
+    def _unique_pip_indices(self) -> np.array:
+        return self._pattern_store.indices
+
     def get_fit_martin(self):
         return self._fit_martin
 
     def get_permutation_martins(self):
         return self._perm_martins
 
+    def get_permutation_reps(self):
+        return self._perm_reps
+
+    def get_permutation_pvalue(self):
+        return self._perm_pvalue
+
+    def get_data_fingerprint(self):
+        return self._data_fingerprint
+
+    def save(self, path: str):
+        """
+        Writes the trained model to an uncompressed npz file: cluster centers, selected long and short clusters,
+        n_pips / lookback / hold_period, fit martin and the fingerprint of the training data. Nothing is pickled.
+
+        :param path: File path, numpy adds .npz if it has no extension.
+        """
+        np.savez(path, **self.get_model_state())
+
+    def load(self, path: str, data: np.array = None):
+        """
+        Restores a model written by save, ready to predict.
+
+        :param path: npz file path.
+        :param data: Optional training data, checked against the fingerprint of the data the model was trained on.
+        :raises ValueError: If the model was saved with a different n_pips, lookback or hold_period, or was trained on
+        other data.
+        """
+        with np.load(path, allow_pickle=False) as model:
+            state = dict(model)
+        self.set_model_state(state, data)
+
+    def get_model_state(self) -> dict:
+        """:return: The trained model as a dict of small numpy arrays, the contents of the file written by save."""
+        if self._center_matrix is None:
+            raise ValueError("No trained model, train the miner first")
+
+        return {
+            'config': np.array([self._n_pips, self._lookback, self._hold_period], dtype=np.int64),
+            'centers': self._center_matrix,
+            'selected_long': np.array(self._selected_long, dtype=np.int64),
+            'selected_short': np.array(self._selected_short, dtype=np.int64),
+            'fit_martin': np.array(np.nan if self._fit_martin is None else self._fit_martin),
+            'data_fingerprint': np.array(self._data_fingerprint or ''),
+        }
+
+    def set_model_state(self, state: dict, data: np.array = None):
+        """
+        Restores a model from get_model_state, see load.
+        """
+        config = tuple(state['config'].tolist())
+        if config != (self._n_pips, self._lookback, self._hold_period):
+            raise ValueError(f"Model has n_pips, lookback, hold_period = {config}, expected "
+                             f"{(self._n_pips, self._lookback, self._hold_period)}")
+
+        fingerprint = str(state['data_fingerprint']) or None
+        if data is not None and data_fingerprint(data) != fingerprint:
+            raise ValueError("Model was trained on other data")
+
+        fit_martin = float(state['fit_martin'])
+        self._cluster_centers = state['centers'].tolist()
+        self._selected_long = state['selected_long'].tolist()
+        self._selected_short = state['selected_short'].tolist()
+        self._fit_martin = None if np.isnan(fit_martin) else fit_martin
+        self._data_fingerprint = fingerprint
+        self._build_predict_index()
+
     def plot_cluster_examples(self, candle_data: pd.DataFrame, cluster_i: int, grid_size: int = 5):
         plt.style.use('dark_background')
         fig, axs = plt.subplots(grid_size, grid_size)
@@ -75,146 +222,168 @@ class PIPPatternMiner:
         plt.show()
 
     def predict(self, pips_y: list):
-        norm_y = (np.array(pips_y) - np.mean(pips_y)) / np.std(pips_y)
+        return float(self.predict_batch(np.asarray(pips_y, dtype=np.float64)[None, :])[0])
+
+    def predict_batch(self, patterns: np.array) -> np.array:
+        """
+        Signals of many PIP patterns at once.
+
+        :param patterns: (n_patterns x n_pips) array of PIP prices, one pattern per row.
+        :return: float array, 1.0 if the nearest cluster of the z-score normalized pattern is a selected long cluster,
+        -1.0 if it is a selected short cluster and 0.0 otherwise or if the pattern can not be normalized.
+        """
+        patterns = np.asarray(patterns, dtype=np.float64)
+        if self._center_matrix is None or len(self._center_matrix) == 0:
+            return np.zeros(len(patterns))
+
+        norm = (patterns - patterns.mean(axis=1, keepdims=True)) / patterns.std(axis=1, keepdims=True)
 
         # Find cluster
-        best_dist = 1.e30
-        best_clust = -1
-        for clust_i in range(len(self._cluster_centers)):
-            center = np.array(self._cluster_centers[clust_i])
-            dist = np.linalg.norm(norm_y - center)
-            if dist < best_dist:
-                best_dist = dist
-                best_clust = clust_i
-
-        if best_clust in self._selected_long:
-            return 1.0
-        elif best_clust in self._selected_short:
-            return -1.0
-        else:
-            return 0.0
-
-    def train(self, arr: np.array, n_reps=-1):
+        diff = norm[:, None, :] - self._center_matrix[None, :, :]
+        dist = np.einsum('ijk,ijk->ij', diff, diff)
+        best_clust = dist.argmin(axis=1)
+        signal = self._cluster_signal_map[best_clust]
+        signal[np.isnan(dist).any(axis=1)] = 0.0
+        return signal
+
+    def train(self, arr: np.array, n_reps=-1, alpha: float | None = None, confidence: float = 0.95):
+        # With alpha, the permutation test stops as soon as the p-value is known to be below or above alpha with
+        # the given confidence, instead of running all n_reps. The bound is checked after 1 / alpha reps and then
+        # each time the reps grow by half, with no correction for the repeated looks, so the error rate of the
+        # stopping decision is somewhat above 1 - confidence.
+        self._fit_martin = self._fit(arr)
+        self._data_fingerprint = data_fingerprint(arr)
+
+        # Results of a previous train describe another fit
+        self._perm_martins = []
+        self._perm_reps = None
+        self._perm_pvalue = None
+
+        print(self._fit_martin)
+
+        if n_reps <= 1:
+            return
+
+        perm_martins = self._run_permutations(arr, n_reps, alpha, confidence)
+        n_better = sum(perm_martin >= self._fit_martin for perm_martin in perm_martins)
+        self._perm_martins = perm_martins
+        self._perm_reps = len(perm_martins)
+        self._perm_pvalue = (1 + n_better) / (1 + len(perm_martins))
+        print("p-value", self._perm_pvalue, "after", self._perm_reps, "reps")
+
+    def _run_permutations(self, arr: np.array, n_reps: int, alpha: float | None, confidence: float) -> list:
+        # Start monte carlo permutation test. Every rep shuffles and fits a fresh miner from its own seed, in a
+        # worker process when n_jobs > 1, this miner keeps the fit on arr. Stopping is decided on the reps in rep
+        # order, so it happens at the same rep however the workers finish.
+        rep_seeds = self._seeds.spawn(n_reps - 1)
+        config = (self._n_pips, self._lookback, self._hold_period, self._silhouette_sample)
+        z = NormalDist().inv_cdf(confidence)
+        perm_martins = []
+        if self._n_jobs == 1:
+            for rep_seed in rep_seeds:
+                perm_martins.append(_permutation_martin(config, arr, rep_seed))
+                print("rep", len(perm_martins), "of", len(rep_seeds))
+                if alpha is not None and _pvalue_resolved(perm_martins, self._fit_martin, alpha, z):
+                    break
+            return perm_martins
+
+        with ProcessPoolExecutor(max_workers=self._n_jobs) as pool:
+            futures = {pool.submit(_permutation_martin, config, arr, rep_seed): rep
+                       for rep, rep_seed in enumerate(rep_seeds)}
+            finished = {}
+            for done, future in enumerate(as_completed(futures), 1):
+                finished[futures[future]] = future.result()
+                print("rep", done, "of", len(rep_seeds))
+
+                resolved = False
+                while len(perm_martins) in finished and not resolved:
+                    perm_martins.append(finished.pop(len(perm_martins)))
+                    resolved = alpha is not None and _pvalue_resolved(perm_martins, self._fit_martin, alpha, z)
+                if resolved:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    break
+
+        return perm_martins
+
+    def _fit(self, arr: np.array) -> float:
+        # Mines and clusters patterns of arr, selects the long and short clusters and returns their martin ratio
         self._data = arr
-        self._returns = pd.Series(arr).diff().shift(-1)
+        self._returns = np.append(np.diff(arr), np.nan)
         self._find_unique_patterns()
 
-        search_instance = silhouette_ksearch(
-            self._unique_pip_patterns, 5, 40, algorithm=silhouette_ksearch_type.KMEANS).process()
-
-        amount = search_instance.get_amount()
+        amount = self._search_cluster_amount()
         self._kmeans_cluster_patterns(amount)
 
         self._get_cluster_signals()
         self._assign_clusters()
-        self._fit_martin = self._get_total_performance()
+        self._build_predict_index()
+        return self._get_total_performance()
 
-        print(self._fit_martin)
+    def _build_predict_index(self):
+        self._center_matrix = np.array(self._cluster_centers, dtype=np.float64).reshape(-1, self._n_pips)
+        self._cluster_signal_map = np.zeros(len(self._center_matrix))
+        self._cluster_signal_map[self._selected_short] = -1.0
+        self._cluster_signal_map[self._selected_long] = 1.0  # Long wins if a cluster is in both
 
-        if n_reps <= 1:
+    def _find_unique_patterns(self):
+        # Find unique pip patterns in data
+        self._pattern_store.clear()
+
+        # PIPs of the lookback windows ending at lookback - 1 up to len(data) - hold_period - 1, all at once
+        n_windows = len(self._data) - self._hold_period - self._lookback + 1
+        if n_windows <= 0:
             return
 
-        # Start monte carlo permutation test
-        data_copy = self._data.copy()
-        returns_copy = self._returns.copy()
-
-        for rep in range(1, n_reps):
-            x = np.diff(data_copy).copy()
-            np.random.shuffle(x)
-            x = np.concatenate([np.array([data_copy[0]]), x])
-            self._data = np.cumsum(x)
-            self._returns = pd.Series(self._data).diff().shift(-1)
-            print("rep", rep)
-            self._find_unique_patterns()
-            search_instance = silhouette_ksearch(
-                self._unique_pip_patterns, 5, 40, algorithm=silhouette_ksearch_type.KMEANS).process()
-            amount = search_instance.get_amount()
-            self._kmeans_cluster_patterns(amount)
-            self._get_cluster_signals()
-            self._assign_clusters()
-            perm_martin = self._get_total_performance()
-            self._perm_martins.append(perm_martin)
+        windows = sliding_window_view(self._data, self._lookback)[:n_windows]
+        pips_x, pips_y = find_pips_batch(windows, self._n_pips, 3)
+        pips_x += np.arange(n_windows)[:, None]
 
-    def _find_unique_patterns(self):
-        # Find unique pip patterns in data
-        self._unique_pip_indices.clear()
-        self._unique_pip_patterns.clear()
-
-        last_pips_x = [0] * self._n_pips
-        for i in range(self._lookback - 1, len(self._data) - self._hold_period):
-            start_i = i - self._lookback + 1
-            window = self._data[start_i: i + 1]
-            pips_x, pips_y = find_pips(window, self._n_pips, 3)
-            pips_x = [j + start_i for j in pips_x]
-
-            # Check internal pips to see if it is the same as last
-            same = True
-            for j in range(1, self._n_pips - 1):
-                if pips_x[j] != last_pips_x[j]:
-                    same = False
-                    break
+        # Check internal pips to see if it is the same as last
+        last_pips_x = np.concatenate([np.zeros((1, self._n_pips), dtype=np.int64), pips_x[:-1]])
+        unique = (pips_x[:, 1:-1] != last_pips_x[:, 1:-1]).any(axis=1)
 
-            if not same:
-                # Z-Score normalize pattern
-                pips_y = list((np.array(pips_y) - np.mean(pips_y)) / np.std(pips_y))
-                self._unique_pip_patterns.append(pips_y)
-                self._unique_pip_indices.append(i)
+        # Z-Score normalize patterns
+        patterns = pips_y[unique]
+        patterns = (patterns - patterns.mean(axis=1, keepdims=True)) / patterns.std(axis=1, keepdims=True)
+        self._pattern_store.reserve(len(patterns))
+        self._pattern_store.extend(patterns, np.flatnonzero(unique) + self._lookback - 1)
 
-            last_pips_x = pips_x
+    def _search_cluster_amount(self) -> int:
+        # Number of clusters from 5 to 39 with the best silhouette
+        amount, _ = silhouette_ksearch(self._unique_pip_patterns, 5, 40, seed=self._seeds.spawn(1)[0],
+                                       n_jobs=self._n_jobs, sample_size=self._silhouette_sample)
+        return amount
 
     def _kmeans_cluster_patterns(self, amount_clusters):
         # Cluster Patterns
-        initial_centers = kmeans_plusplus_initializer(self._unique_pip_patterns, amount_clusters).initialize()
-        kmeans_instance = kmeans(self._unique_pip_patterns, initial_centers)
-        kmeans_instance.process()
+        patterns = self._unique_pip_patterns
+        rng = np.random.default_rng(self._seeds.spawn(1)[0])
+        labels, centers = kmeans(patterns, kmeans_plusplus(patterns, amount_clusters, rng))
 
         # Extract clustering results: clusters and their centers
-        self._pip_clusters = kmeans_instance.get_clusters()
-        self._cluster_centers = kmeans_instance.get_centers()
+        self._pip_clusters = [np.flatnonzero(labels == clust_i).tolist() for clust_i in range(len(centers))]
+        self._cluster_centers = centers.tolist()
 
     def _get_martin(self, rets: np.array):
-        rsum = np.sum(rets)
-        short = False
-        if rsum < 0.0:
-            rets *= -1
-            rsum *= -1
-            short = True
-
-        csum = np.cumsum(rets)
-        eq = pd.Series(np.exp(csum))
-        sumsq = np.sum(((eq / eq.cummax()) - 1) ** 2.0)
-        ulcer_index = (sumsq / len(rets)) ** 0.5
-        martin = rsum / ulcer_index
-        if short:
-            martin = -martin
-
-        return martin
+        return float(martin_ratios(np.asarray(rets, dtype=np.float64)[None, :])[0])
 
     def _get_cluster_signals(self):
-        self._cluster_signals.clear()
-
-        for clust in self._pip_clusters:  # Loop through each cluster
-            signal = np.zeros(len(self._data))
-            for mem in clust:  # Loop through each member in cluster
-                arr_i = self._unique_pip_indices[mem]
-
-                # Fill signal with 1s following pattern identification
-                # for hold period specified
-                signal[arr_i: arr_i + self._hold_period] = 1.
-
-            self._cluster_signals.append(signal)
+        # Row i is 1 for the hold period following every pattern identification of cluster i. Each pattern adds 1 at
+        # its index and removes it hold_period bars later, bars with a positive running count are held.
+        n = len(self._data)
+        rows = np.repeat(np.arange(len(self._pip_clusters)), [len(clust) for clust in self._pip_clusters])
+        starts = self._unique_pip_indices[np.concatenate(self._pip_clusters).astype(np.int64)]
+        counts = np.zeros((len(self._pip_clusters), n + 1), dtype=np.int64)
+        np.add.at(counts, (rows, starts), 1)
+        np.add.at(counts, (rows, np.minimum(starts + self._hold_period, n)), -1)
+        self._cluster_signals = (np.cumsum(counts[:, :n], axis=1) > 0).astype(np.float64)
 
     def _assign_clusters(self):
         self._selected_long.clear()
         self._selected_short.clear()
 
         # Assign clusters to long/short/neutral
-        cluster_martins = []
-        for clust_i in range(len(self._pip_clusters)):  # Loop through each cluster
-            sig = self._cluster_signals[clust_i]
-            sig_ret = self._returns * sig
-            martin = self._get_martin(sig_ret)
-            cluster_martins.append(martin)
+        cluster_martins = martin_ratios(self._cluster_signals * self._returns)
 
         best_long = np.argmax(cluster_martins)
         best_short = np.argmin(cluster_martins)
@@ -222,19 +391,11 @@ class PIPPatternMiner:
         self._selected_short.append(best_short)
 
     def _get_total_performance(self):
+        is_long = np.isin(np.arange(len(self._pip_clusters)), self._selected_long)
+        is_short = np.isin(np.arange(len(self._pip_clusters)), self._selected_short) & ~is_long
 
-        long_signal = np.zeros(len(self._data))
-        short_signal = np.zeros(len(self._data))
-
-        for clust_i in range(len(self._pip_clusters)):
-            if clust_i in self._selected_long:
-                long_signal += self._cluster_signals[clust_i]
-            elif clust_i in self._selected_short:
-                short_signal += self._cluster_signals[clust_i]
-
-        long_signal /= len(self._selected_long)
-        short_signal /= len(self._selected_short)
-        short_signal *= -1
+        long_signal = self._cluster_signals[is_long].sum(axis=0) / len(self._selected_long)
+        short_signal = -self._cluster_signals[is_short].sum(axis=0) / len(self._selected_short)
 
         self._long_signal = long_signal
         self._short_signal = short_signal
@@ -244,6 +405,68 @@ class PIPPatternMiner:
         return martin
 
 
+def martin_ratios(rets: np.array) -> np.array:
+    """
+    Martin ratio, total return over ulcer index, of every row of returns. A row with a negative total return is
+    scored as a short, its ulcer index comes from the flipped returns and its ratio is negative.
+
+    NaN returns are skipped by the total and the equity curve but still count as bars in the ulcer index.
+
+    :param rets: (n_rows x n_bars) array of log returns.
+    :return: Array of n_rows martin ratios.
+    """
+    rets = np.asarray(rets, dtype=np.float64)
+    missing = np.isnan(rets)
+    rets = np.where(missing, 0.0, rets)
+
+    rsum = rets.sum(axis=1)
+    sign = np.where(rsum < 0.0, -1.0, 1.0)
+
+    eq = np.exp(np.cumsum(rets * sign[:, None], axis=1))
+    eq[missing] = -np.inf  # Not a peak
+    with np.errstate(divide='ignore', invalid='ignore'):
+        drawdown = eq / np.maximum.accumulate(eq, axis=1) - 1
+        drawdown[missing] = 0.0
+
+        ulcer_index = np.sqrt((drawdown ** 2.0).sum(axis=1) / rets.shape[1])
+        return rsum / ulcer_index
+
+
+def data_fingerprint(arr: np.array) -> str:
+    """:return: sha256 hex digest of the array as float64 values."""
+    return hashlib.sha256(np.ascontiguousarray(arr, dtype=np.float64).tobytes()).hexdigest()
+
+
+def _pvalue_resolved(perm_martins: list, fit_martin: float, alpha: float, z: float) -> bool:
+    # True once the one-sided Wilson bound on the share of permutations beating the fit clears alpha. The p-value
+    # estimate cannot get below alpha before 1 / alpha reps, so fewer reps are never resolved. Past that the bound
+    # is only looked at on a geometric schedule, every time the reps grow by half, to keep the looks few.
+    n = len(perm_martins)
+    look = math.ceil(1 / alpha)
+    while look < n:
+        look = math.ceil(look * 1.5)
+    if n != look:
+        return False
+
+    p = sum(perm_martin >= fit_martin for perm_martin in perm_martins) / n
+    center = (p + z ** 2 / (2 * n)) / (1 + z ** 2 / n)
+    half_width = z * math.sqrt(p * (1 - p) / n + z ** 2 / (4 * n ** 2)) / (1 + z ** 2 / n)
+    return center + half_width < alpha or center - half_width > alpha
+
+
+def _permutation_martin(config: tuple, arr: np.array, seed: np.random.SeedSequence) -> float:
+    # One rep of the permutation test: fits a fresh miner on arr with its log returns shuffled
+    n_pips, lookback, hold_period, silhouette_sample = config
+    shuffle_seed, miner_seed = seed.spawn(2)
+
+    x = np.diff(arr)
+    np.random.default_rng(shuffle_seed).shuffle(x)
+    x = np.concatenate([np.array([arr[0]]), x])
+
+    miner = PIPPatternMiner(n_pips, lookback, hold_period, seed=miner_seed, silhouette_sample=silhouette_sample)
+    return miner._fit(np.cumsum(x))
+
+
 def main():
     data = pd.read_csv('.././data/BTCUSDT3600.csv')
     data['date'] = data['date'].astype('datetime64[s]')
@@ -258,8 +481,11 @@ def main():
     pip_miner.train(arr, n_reps=-1)
 
     '''
-    # Monte Carlo test, takes about an hour..
-    pip_miner.train(arr, n_reps=100)
+    # Monte Carlo test, takes about an hour on one core. Reps run in parallel across n_jobs processes and alpha
+    # stops the test once the p-value is clearly above or below it
+    pip_miner = PIPPatternMiner(n_pips=5, lookback=24, hold_period=6, seed=0, n_jobs=8)
+    pip_miner.train(arr, n_reps=100, alpha=0.05)
+    print(pip_miner.get_permutation_pvalue(), pip_miner.get_permutation_reps())
 
     plt.style.use('dark_background')
     actual_martin = pip_miner.get_fit_martin()
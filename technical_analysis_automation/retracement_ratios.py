@@ -3,7 +3,7 @@ import numpy as np
 import pandas as pd
 import scipy
 
-from directional_change import get_extremes
+from directional_change import get_extremes_multi
 
 data = pd.read_csv('.././data/BTCUSDT3600.csv')
 data['date'] = data['date'].astype('datetime64[s]')
@@ -11,8 +11,8 @@ data = data.set_index('date')
 plt.style.use('dark_background')
 
 
-for sigma in [0.01, 0.02, 0.03, 0.04]:
-    extremes = get_extremes(data, sigma)
+sigmas = [0.01, 0.02, 0.03, 0.04]
+for sigma, extremes in zip(sigmas, get_extremes_multi(data, sigmas)):  # Columns converted once for all sigmas
 
     # Find segment heights, retracement ratios
     extremes['seg_height'] = (extremes['ext_p'] - extremes['ext_p'].shift(1)).abs()
@@ -1,62 +1,247 @@
+from collections import deque
+
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from extremes import rolling_extremes_array
+from swing_engine import SwingTrace, is_swing, swing_mask
+
 
 # Checks if there is a local top detected at curr index
-def rw_top(data: np.array, curr_index: int, order: int) -> bool:
-    if curr_index < order * 2 + 1:
-        return False
+def rw_top(data: np.array, curr_index: int, order: int, backend: str = 'python',
+           trace: SwingTrace | None = None) -> bool:
+    return is_swing(data, curr_index, order, True, backend, trace)
 
-    top = True
-    k = curr_index - order
-    v = data[k]
-    for i in range(1, order + 1):
-        if data[k + i] > v or data[k - i] > v:
-            top = False
-            break
 
-    return top
+# Checks if there is a local bottom detected at curr index
+def rw_bottom(data: np.array, curr_index: int, order: int, backend: str = 'python',
+              trace: SwingTrace | None = None) -> bool:
+    return is_swing(data, curr_index, order, False, backend, trace)
 
 
-# Checks if there is a local top detected at curr index
-def rw_bottom(data: np.array, curr_index: int, order: int) -> bool:
-    if curr_index < order * 2 + 1:
-        return False
+def rw_extreme_masks(data: np.array, order: int) -> tuple[np.array, np.array]:
+    """
+    Vectorized rw_top / rw_bottom for every index of the data in linear time.
+
+    The masks are indexed by confirmation index, tops[i] == rw_top(data, i, order). Each entry only depends on
+    data[:i + 1], so iterating over the masks bar by bar does not look ahead.
+
+    :param data: np.array of price data.
+    :param order: Number of bars on each side of the extreme.
+    :return: Boolean arrays (tops, bottoms).
+    """
+    return swing_mask(data, order, True), swing_mask(data, order, False)
 
-    bottom = True
-    k = curr_index - order
-    v = data[k]
-    for i in range(1, order + 1):
-        if data[k + i] < v or data[k - i] < v:
-            bottom = False
-            break
 
-    return bottom
+def rw_extreme_flags(data: np.array, order: int, detector: 'RollingExtremaDetector | None' = None,
+                     index: 'RollingExtremaIndex | None' = None):
+    """
+    Iterates over (is_top, is_bottom) for each bar, equivalent to calling rw_top and rw_bottom at every index.
 
+    :param data: np.array of price data.
+    :param order: Number of bars on each side of the extreme.
+    :param detector: Optional streaming detector to source the extrema from, nothing pushed yet. Prices are pushed
+    into it lazily, one bar per iteration, instead of computing the flags over the whole array up front.
+    :param index: Optional multi-order index built on the same data, avoids rescanning the data for each order.
+    :return: Iterator of (bool, bool) tuples, one per bar.
+    """
+    if detector is not None:
+        assert detector.order == order, "Detector order must match order."
+        assert len(detector) == 0, "Detector must be fresh, its bars are the bars of data."
+        pushed = map(detector.push, np.asarray(data).tolist())
+        return ((top is not None, bottom is not None) for top, bottom in pushed)
 
-def rw_extremes(data: np.array, order: int):
+    if index is not None:
+        assert len(index) == len(data), "Index must be built on the same data."
+        tops, bottoms = index.masks(order)
+    else:
+        tops, bottoms = rw_extreme_masks(data, order)
+    return zip(tops.tolist(), bottoms.tolist())
+
+
+def rw_extremes(data: np.array, order: int, structured: bool = False):
     # Rolling window local tops and bottoms
-    tops = []
-    bottoms = []
-    for i in range(len(data)):
-        if rw_top(data, i, order):
-            # top[0] = confirmation index
-            # top[1] = index of top
-            # top[2] = price of top
-            top = [i, i - order, data[i - order]]
-            tops.append(top)
-
-        if rw_bottom(data, i, order):
-            # bottom[0] = confirmation index
-            # bottom[1] = index of bottom
-            # bottom[2] = price of bottom
-            bottom = [i, i - order, data[i - order]]
-            bottoms.append(bottom)
+    # structured=True returns EXTREMES_DTYPE structured arrays instead of lists of lists
+    tops_mask, bottoms_mask = rw_extreme_masks(data, order)
+    if structured:
+        return rolling_extremes_array(data, tops_mask, order), rolling_extremes_array(data, bottoms_mask, order)
+
+    # top[0] = confirmation index
+    # top[1] = index of top
+    # top[2] = price of top
+    tops = [[i, i - order, data[i - order]] for i in np.flatnonzero(tops_mask).tolist()]
+
+    # bottom[0] = confirmation index
+    # bottom[1] = index of bottom
+    # bottom[2] = price of bottom
+    bottoms = [[i, i - order, data[i - order]] for i in np.flatnonzero(bottoms_mask).tolist()]
 
     return tops, bottoms
 
 
+class RollingExtremaDetector:
+    """
+    Streaming rw_top / rw_bottom. Prices are pushed one bar at a time and newly confirmed extremes are emitted as soon
+    as they are known, using the same semantics (and NaN handling) as rw_top / rw_bottom.
+
+    Only a ring buffer of the last 2 * order + 1 prices is kept, plus two monotonic deques of window max/min
+    candidates, so each push is O(1) amortized and memory does not grow with the length of the feed.
+    """
+
+    def __init__(self, order: int):
+        self.order = order
+        self._window = order * 2 + 1
+        self._prices = [np.nan] * self._window  # Ring buffer, price of bar i is at i % window
+        self._count = 0  # Number of prices pushed, index of the next bar
+
+        # (index, price) candidates for the window max/min, prices decreasing/increasing from the front
+        self._max_candidates = deque()
+        self._min_candidates = deque()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def push(self, price: float) -> tuple[list | None, list | None]:
+        """
+        Adds the next bar and checks whether it confirms an extreme.
+
+        :param price: Price of the new bar.
+        :return: (top, bottom). Each is None or a [confirmation index, index of extreme, price of extreme] list,
+        in the same format as rw_extremes. Indices count bars pushed into this detector.
+        """
+        i = self._count
+        self._count += 1
+        self._prices[i % self._window] = price
+
+        if price == price:  # NaN never breaks an extreme, so it is never a candidate
+            while self._max_candidates and self._max_candidates[-1][1] <= price:
+                self._max_candidates.pop()
+            self._max_candidates.append((i, price))
+
+            while self._min_candidates and self._min_candidates[-1][1] >= price:
+                self._min_candidates.pop()
+            self._min_candidates.append((i, price))
+
+        # Drop candidates that left the window
+        window_start = i - self._window + 1
+        if self._max_candidates and self._max_candidates[0][0] < window_start:
+            self._max_candidates.popleft()
+        if self._min_candidates and self._min_candidates[0][0] < window_start:
+            self._min_candidates.popleft()
+
+        if i < self._window:
+            return None, None
+
+        k = i - self.order
+        v = self._prices[k % self._window]
+
+        top = None
+        if not (self._max_candidates and self._max_candidates[0][1] > v):
+            top = [i, k, v]
+
+        bottom = None
+        if not (self._min_candidates and self._min_candidates[0][1] < v):
+            bottom = [i, k, v]
+
+        return top, bottom
+
+
+def _neighbour_reach(values: np.array, ufunc: np.ufunc, beats: np.ufunc, max_reach: int) -> np.array:
+    """
+    For each value, counts the consecutive values to its right that do not beat it, capped at max_reach.
+
+    Builds a sparse table of ufunc over power of two blocks and extends each reach greedily from the largest block
+    down, so the whole computation is O(n log max_reach) array operations.
+
+    :param values: Float array of values.
+    :param ufunc: NaN-ignoring reduction matching beats (np.fmax for np.greater, np.fmin for np.less).
+    :param beats: Comparison that stops the reach, beats(neighbour, value).
+    :param max_reach: Maximum reach.
+    :return: int64 array of reaches.
+    """
+    n = len(values)
+    levels = [values]  # levels[j][p] = ufunc over values[p:p + 2 ** j]
+    while 2 ** len(levels) <= max_reach and 2 ** len(levels) <= n:
+        half = 2 ** (len(levels) - 1)
+        levels.append(ufunc(levels[-1][:-half], levels[-1][half:]))
+
+    reach = np.zeros(n, dtype=np.int64)
+    positions = np.arange(n)
+    for j in reversed(range(len(levels))):
+        size = 2 ** j
+        block_start = positions + reach + 1
+        fits = (block_start < len(levels[j])) & (reach + size <= max_reach)
+        extend = fits.copy()
+        extend[fits] = ~beats(levels[j][block_start[fits]], values[fits])
+        reach[extend] += size
+
+    return reach
+
+
+class RollingExtremaIndex:
+    """
+    Rolling window extrema for every order, computed once.
+
+    top_order[k] is the largest order for which bar k is confirmed as a local top by rw_top, -1 if it never is.
+    Because a top at some order is also a top at every lower order, "extrema at order m" is every bar whose
+    top_order / bottom_order is at least m, which lets order sweeps reuse one pass over the data.
+    """
+
+    def __init__(self, data: np.array, max_order: int | None = None):
+        """
+        :param data: np.array of price data.
+        :param max_order: Largest order that will be queried. Bounds the size of the sparse tables, None for no
+        limit.
+        """
+        self._data = data
+        values = np.asarray(data, dtype=np.float64)
+        n = len(values)
+        self.max_order = max_order
+        max_reach = n if max_order is None else max_order
+
+        # rw_top only confirms from index 2 * order + 1, so the extreme at k needs order <= k - 1
+        warm_up = np.arange(n) - 1
+        self.top_order = np.minimum.reduce([
+            _neighbour_reach(values, np.fmax, np.greater, max_reach),
+            _neighbour_reach(values[::-1], np.fmax, np.greater, max_reach)[::-1],
+            warm_up
+        ])
+        self.bottom_order = np.minimum.reduce([
+            _neighbour_reach(values, np.fmin, np.less, max_reach),
+            _neighbour_reach(values[::-1], np.fmin, np.less, max_reach)[::-1],
+            warm_up
+        ])
+
+    def __len__(self) -> int:
+        return len(self.top_order)
+
+    def masks(self, order: int) -> tuple[np.array, np.array]:
+        """
+        :param order: Number of bars on each side of the extreme.
+        :return: Boolean arrays (tops, bottoms) indexed by confirmation index, same as rw_extreme_masks.
+        """
+        assert self.max_order is None or order <= self.max_order, "Order is larger than the index max_order."
+        n = len(self)
+        tops = np.zeros(n, dtype=bool)
+        bottoms = np.zeros(n, dtype=bool)
+        if order < n:
+            tops[order:] = self.top_order[:n - order] >= order
+            bottoms[order:] = self.bottom_order[:n - order] >= order
+        return tops, bottoms
+
+    def extremes(self, order: int):
+        """
+        :param order: Number of bars on each side of the extreme.
+        :return: Same tops and bottoms lists as rw_extremes(data, order).
+        """
+        assert self.max_order is None or order <= self.max_order, "Order is larger than the index max_order."
+        data = self._data
+        tops = [[k + order, k, data[k]] for k in np.flatnonzero(self.top_order >= order).tolist()]
+        bottoms = [[k + order, k, data[k]] for k in np.flatnonzero(self.bottom_order >= order).tolist()]
+        return tops, bottoms
+
+
 def main():
     data = pd.read_csv('.././data/BTCUSDT86400.csv')
     data['date'] = data['date'].astype('datetime64[s]')
@@ -5,54 +5,51 @@ import numpy as np
 import pandas as pd
 from matplotlib import pyplot as plt
 
+from swing_engine import SWING_BOTTOM, SWING_TOP, SwingTrace, classify_swings, is_swing
 
-def is_data_point_a_local_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool) -> bool:
+
+def is_data_point_a_local_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool,
+                                backend: str = 'python', trace: SwingTrace | None = None) -> bool:
     """
     Check if the current index is a local swing based on the data set and time radius.
-    """
-    if current_index < time_radius * 2 + 1:
-        print("")
-        print(f"current_index: {current_index} is less than time_radius * 2 + 1: {time_radius * 2 + 1}")
-        logging.info(f"current_index: {current_index} does not have enough data points to form a rolling window")
-        return False
-
-    comparison_operator = np.greater if is_top else np.less
-
-    time_span_starting_index = current_index - time_radius
-    time_span_starting_value = data_set[time_span_starting_index]
-
-    print(f"current_index: {current_index}")
-    print(f"time_span_starting_index: {time_span_starting_index}")
-    print(f"time_span_starting_value: {time_span_starting_value}")
 
+    Per-bar diagnostics are collected in the swing_engine.SwingTrace passed as trace rather than printed.
+    """
     # If any of the data points within the time span are greater than the starting value, return False (not a local extreme)
-    return all(
-        not comparison_operator(data_set[time_span_starting_index + loop_index], time_span_starting_value) and
-        not comparison_operator(data_set[time_span_starting_index - loop_index], time_span_starting_value)
-        for loop_index in range(1, time_radius + 1)
-    )
+    return is_swing(data_set, current_index, time_radius, is_top, backend, trace)
+
 
+def detect_swing_extremes_across_data_set(data_set: np.array, time_radius: int, trace: SwingTrace | None = None):
+    """
+    Finds every swing top and bottom of the data set.
 
-def detect_swing_extremes_across_data_set(data_set: np.array, time_radius: int):
-    local_tops = [
-        [index_of_bar_to_test, index_of_bar_to_test - time_radius, data_set[index_of_bar_to_test - time_radius]]
-        for index_of_bar_to_test in range(len(data_set))
-        if is_data_point_a_local_swing(data_set=data_set, current_index=index_of_bar_to_test, time_radius=time_radius,
-                                       is_top=True)
-    ]
+    :param data_set: np.array of price data.
+    :param time_radius: Number of bars on each side of the swing.
+    :param trace: Optional trace recording the scan. Its summary is logged once the scan is done.
+    :return: DataFrames of swing tops and swing bottoms.
+    """
+    # One pass classifies every bar as top, bottom, both (flat window) or neither
+    swing_flags = classify_swings(data_set, time_radius, trace=trace)
 
-    local_bottoms = [
-        [loop_index, loop_index - time_radius, data_set[loop_index - time_radius]]
-        for loop_index in range(len(data_set))
-        if is_data_point_a_local_swing(data_set, loop_index, time_radius, False)
-    ]
+    if trace is not None:
+        logging.info(f"Swing scan summary: {trace.summary()}")
 
     return (
-        pd.DataFrame(local_tops, columns=["confirmation_index", "index_of_swing", "price_of_swing"]),
-        pd.DataFrame(local_bottoms, columns=["confirmation_index", "index_of_swing", "price_of_swing"])
+        _swing_frame(data_set, np.flatnonzero(swing_flags & SWING_TOP), time_radius),
+        _swing_frame(data_set, np.flatnonzero(swing_flags & SWING_BOTTOM), time_radius)
     )
 
 
+def _swing_frame(data_set: np.array, confirmation_index: np.array, time_radius: int) -> pd.DataFrame:
+    """Wraps the swing columns in a DataFrame without copying them."""
+    index_of_swing = confirmation_index - time_radius
+    return pd.DataFrame({
+        "confirmation_index": confirmation_index,
+        "index_of_swing": index_of_swing,
+        "price_of_swing": np.asarray(data_set)[index_of_swing]
+    }, copy=False)
+
+
 def main():
     data = pd.read_csv('.././data/BTCUSDT86400.csv')
     data['date'] = data['date'].astype('datetime64[s]')
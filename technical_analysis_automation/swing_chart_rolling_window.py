@@ -2,44 +2,35 @@ import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
 
+from extremes import rolling_extremes_array
+from swing_engine import SwingTrace, is_swing, swing_mask
 
-def is_rolling_window_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool) -> bool:
-    if current_index < time_radius * 2 + 1:
-        return False
 
-    result_flag = True
-    comparison_operator = np.greater if is_top else np.less
+def is_rolling_window_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool,
+                            backend: str = 'python', trace: SwingTrace | None = None) -> bool:
+    return is_swing(data_set, current_index, time_radius, is_top, backend, trace)
 
-    time_span_starting_index = current_index - time_radius
-    time_span_starting_value = data_set[time_span_starting_index]
 
-    for loop_index in range(1, time_radius + 1):
-        if comparison_operator(data_set[time_span_starting_index + loop_index], time_span_starting_value) or \
-                comparison_operator(data_set[time_span_starting_index - loop_index], time_span_starting_value):
-            result_flag = False
-            break
-
-    return result_flag
-
-
-def collate_swings(data_set: np.array, time_radius: int):
+def collate_swings(data_set: np.array, time_radius: int, structured: bool = False):
     # Rolling window local tops and bottoms
-    local_tops = []
-    local_bottoms = []
-    for loop_index in range(len(data_set)):
-        if is_rolling_window_swing(data_set, loop_index, time_radius, True):
-            # top[0] = confirmation index
-            # top[1] = index of top
-            # top[2] = price of top
-            local_top = [loop_index, loop_index - time_radius, data_set[loop_index - time_radius]]
-            local_tops.append(local_top)
-
-        if is_rolling_window_swing(data_set, loop_index, time_radius, False):
-            # bottom[0] = confirmation index
-            # bottom[1] = index of bottom
-            # bottom[2] = price of bottom
-            local_bottom = [loop_index, loop_index - time_radius, data_set[loop_index - time_radius]]
-            local_bottoms.append(local_bottom)
+    # structured=True returns EXTREMES_DTYPE structured arrays instead of lists of lists
+    tops_mask = swing_mask(data_set, time_radius, True)
+    bottoms_mask = swing_mask(data_set, time_radius, False)
+    if structured:
+        return (rolling_extremes_array(data_set, tops_mask, time_radius),
+                rolling_extremes_array(data_set, bottoms_mask, time_radius))
+
+    # top[0] = confirmation index
+    # top[1] = index of top
+    # top[2] = price of top
+    local_tops = [[loop_index, loop_index - time_radius, data_set[loop_index - time_radius]]
+                  for loop_index in np.flatnonzero(tops_mask).tolist()]
+
+    # bottom[0] = confirmation index
+    # bottom[1] = index of bottom
+    # bottom[2] = price of bottom
+    local_bottoms = [[loop_index, loop_index - time_radius, data_set[loop_index - time_radius]]
+                     for loop_index in np.flatnonzero(bottoms_mask).tolist()]
 
     return local_tops, local_bottoms
 
@@ -0,0 +1,337 @@
+"""Rolling window swing tests behind interchangeable backends, with optional tracing of the tests run."""
+import time
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class SwingBackend:
+    """
+    Implementation of the rolling window swing test.
+
+    A bar confirmed at current_index is a swing top (bottom) if no price within time_radius bars on either side of
+    current_index - time_radius is greater (less) than it. Confirmation starts at current_index = 2 * time_radius + 1.
+    """
+    name: str
+
+    # is_swing(data_set, current_index, time_radius, is_top) -> bool, tests a single confirmation index
+    is_swing: Callable[[np.array, int, int, bool], bool]
+
+    # swing_mask(data_set, time_radius, is_top) -> bool np.array, tests every confirmation index
+    swing_mask: Callable[[np.array, int, bool], np.array]
+
+    # classify(data_set, time_radius) -> int8 np.array of SWING_TOP | SWING_BOTTOM flags, both tests in one pass
+    classify: Callable[[np.array, int], np.array]
+
+
+# Swing classification flags. A bar in a flat window is both a top and a bottom.
+SWING_TOP = 1
+SWING_BOTTOM = 2
+
+
+def _python_is_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool) -> bool:
+    if current_index < time_radius * 2 + 1:
+        return False
+
+    k = current_index - time_radius
+    v = data_set[k]
+    if is_top:
+        for i in range(1, time_radius + 1):
+            if data_set[k + i] > v or data_set[k - i] > v:
+                return False
+    else:
+        for i in range(1, time_radius + 1):
+            if data_set[k + i] < v or data_set[k - i] < v:
+                return False
+
+    return True
+
+
+def _python_swing_mask(data_set: np.array, time_radius: int, is_top: bool) -> np.array:
+    return np.array([_python_is_swing(data_set, i, time_radius, is_top) for i in range(len(data_set))], dtype=bool)
+
+
+def _python_classify(data_set: np.array, time_radius: int) -> np.array:
+    flags = np.zeros(len(data_set), dtype=np.int8)
+    for current_index in range(time_radius * 2 + 1, len(data_set)):
+        k = current_index - time_radius
+        v = data_set[k]
+        is_top = is_bottom = True
+        for i in range(1, time_radius + 1):
+            left, right = data_set[k - i], data_set[k + i]
+            if left > v or right > v:
+                is_top = False
+            if left < v or right < v:
+                is_bottom = False
+            if not (is_top or is_bottom):
+                break
+
+        flags[current_index] = SWING_TOP * is_top + SWING_BOTTOM * is_bottom
+
+    return flags
+
+
+def _numpy_is_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool) -> bool:
+    if current_index < time_radius * 2 + 1:
+        return False
+
+    window = np.asarray(data_set[current_index - time_radius * 2: current_index + 1])
+    v = window[time_radius]
+    return not (window > v).any() if is_top else not (window < v).any()
+
+
+def _rolling_reduce(data: np.array, window: int, ufuncs: list[np.ufunc]) -> list[np.array]:
+    """
+    Reduces every full window of consecutive values with NaN-ignoring ufuncs (np.fmax / np.fmin) in O(n).
+
+    Uses the van Herk/Gil-Werman block decomposition: each window spans at most two blocks of length `window`,
+    so its extreme is the suffix extreme of the first block combined with the prefix extreme of the second.
+
+    :param data: Float array of values.
+    :param window: Number of values in each window.
+    :param ufuncs: Binary ufuncs used to combine values, all computed from the same blocks.
+    :return: One array per ufunc of length len(data) - window + 1. Element s is the reduction of data[s:s + window].
+    """
+    n = len(data)
+    n_blocks = -(-n // window)
+    padded = np.full(n_blocks * window, np.nan)
+    padded[:n] = data
+    blocks = padded.reshape(n_blocks, window)
+
+    reduced = []
+    for ufunc in ufuncs:
+        prefix = ufunc.accumulate(blocks, axis=1).ravel()
+        suffix = ufunc.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].ravel()
+        reduced.append(ufunc(suffix[:n - window + 1], prefix[window - 1:n]))
+    return reduced
+
+
+def _numpy_swing_flags(data_set: np.array, time_radius: int, ufuncs: list[np.ufunc]) -> list[np.array]:
+    values = np.asarray(data_set, dtype=np.float64)
+    n = len(values)
+    if n <= time_radius * 2 + 1:
+        return [np.zeros(n, dtype=bool) for _ in ufuncs]
+
+    # Window s covers values[s:s + 2 * time_radius + 1], is centered on s + time_radius and is confirmed at
+    # s + 2 * time_radius. Confirmation starts at 2 * time_radius + 1, so window 0 is skipped.
+    # NaNs are ignored by fmax / fmin and never beat the center, same as the comparisons in the python backend.
+    window = time_radius * 2 + 1
+    centers = values[time_radius + 1:n - time_radius]
+    masks = []
+    for ufunc, reduced in zip(ufuncs, _rolling_reduce(values, window, ufuncs), strict=True):
+        beats = np.greater if ufunc is np.fmax else np.less
+        mask = np.zeros(n, dtype=bool)
+        mask[window:] = ~beats(reduced[1:], centers)
+        masks.append(mask)
+    return masks
+
+
+def _numpy_swing_mask(data_set: np.array, time_radius: int, is_top: bool) -> np.array:
+    return _numpy_swing_flags(data_set, time_radius, [np.fmax if is_top else np.fmin])[0]
+
+
+def _numpy_classify(data_set: np.array, time_radius: int) -> np.array:
+    tops, bottoms = _numpy_swing_flags(data_set, time_radius, [np.fmax, np.fmin])
+    flags = tops.astype(np.int8)
+    flags[bottoms] |= SWING_BOTTOM
+    return flags
+
+
+SWING_BACKENDS = {
+    'python': SwingBackend('python', _python_is_swing, _python_swing_mask, _python_classify),
+    'numpy': SwingBackend('numpy', _numpy_is_swing, _numpy_swing_mask, _numpy_classify),
+}
+
+
+def register_swing_backend(backend: SwingBackend) -> None:
+    """Adds or replaces a backend, making it available by name to is_swing and swing_mask."""
+    SWING_BACKENDS[backend.name] = backend
+
+
+@dataclass
+class SwingTrace:
+    """
+    Counters and sampled per-bar records of swing tests.
+
+    Pass it as trace to the swing tests to record, or to the wrappers built on them: rw_top / rw_bottom,
+    is_rolling_window_swing, is_data_point_a_local_swing and detect_swing_extremes_across_data_set. While no trace is
+    given the swing tests only pay for a single None check.
+
+    set_swing_trace and swing_tracing install a fallback trace for tests called without one, but only for callers
+    that imported this same module object, see set_swing_trace.
+    """
+    # Keep one per-bar record every sample_every bars tested, 0 keeps counters only
+    sample_every: int = 0
+
+    bars_tested: int = 0
+    early_exits: int = 0  # Bars rejected without a comparison, not enough data points to form a rolling window
+    swings_found: int = 0
+
+    # (current_index, time_radius, is_top, is_swing) of the sampled bars
+    records: list = field(default_factory=list)
+
+    def record(self, current_index: int, time_radius: int, is_top: bool, result: bool) -> None:
+        """Adds the outcome of a single swing test."""
+        if self.sample_every > 0 and self.bars_tested % self.sample_every == 0:
+            self.records.append((current_index, time_radius, is_top, result))
+
+        self.bars_tested += 1
+        self.early_exits += current_index < time_radius * 2 + 1
+        self.swings_found += result
+
+    def record_mask(self, time_radius: int, is_top: bool, mask: np.array) -> None:
+        """Adds the outcome of a swing test over every confirmation index of a data set."""
+        n = len(mask)
+        if self.sample_every > 0:
+            first = -self.bars_tested % self.sample_every
+            for current_index in range(first, n, self.sample_every):
+                self.records.append((current_index, time_radius, is_top, bool(mask[current_index])))
+
+        self.bars_tested += n
+        self.early_exits += min(n, time_radius * 2 + 1)
+        self.swings_found += int(np.count_nonzero(mask))
+
+    def summary(self) -> dict:
+        return {
+            'bars_tested': self.bars_tested,
+            'early_exits': self.early_exits,
+            'swings_found': self.swings_found,
+            'records': len(self.records),
+        }
+
+
+_active_trace: SwingTrace | None = None
+
+
+def set_swing_trace(trace: SwingTrace | None) -> SwingTrace | None:
+    """
+    Installs a trace for all swing tests, None disables tracing.
+
+    The installed trace belongs to this module object. With both the package directory and its parent on sys.path,
+    swing_engine and technical_analysis_automation.swing_engine are separate modules and a trace installed through
+    one is not seen by code that imported the other. Import swing_engine through a single path, or pass the trace to
+    each swing test instead.
+
+    :return: The previously installed trace.
+    """
+    global _active_trace
+    previous = _active_trace
+    _active_trace = trace
+    return previous
+
+
+@contextmanager
+def swing_tracing(trace: SwingTrace) -> Iterator[SwingTrace]:
+    """Installs the trace for the duration of the with block."""
+    previous = set_swing_trace(trace)
+    try:
+        yield trace
+    finally:
+        set_swing_trace(previous)
+
+
+def is_swing(data_set: np.array, current_index: int, time_radius: int, is_top: bool, backend: str = 'python',
+             trace: SwingTrace | None = None) -> bool:
+    """
+    Checks if the bar at current_index - time_radius is a swing top / bottom confirmed at current_index.
+
+    :param data_set: np.array of price data.
+    :param current_index: Confirmation index, the swing is time_radius bars before it.
+    :param time_radius: Number of bars on each side of the swing.
+    :param is_top: True to test for a top, False for a bottom.
+    :param backend: Name of the backend. The python loop exits on the first higher / lower neighbour and is the
+    fastest for single queries.
+    :param trace: Trace recording this test, defaults to the installed trace.
+    :return: True if it is a swing.
+    """
+    result = SWING_BACKENDS[backend].is_swing(data_set, current_index, time_radius, is_top)
+    trace = trace if trace is not None else _active_trace
+    if trace is not None:
+        trace.record(current_index, time_radius, is_top, result)
+    return result
+
+
+def swing_mask(data_set: np.array, time_radius: int, is_top: bool, backend: str = 'numpy',
+               trace: SwingTrace | None = None) -> np.array:
+    """
+    Runs the swing test for every confirmation index of the data set.
+
+    :param data_set: np.array of price data.
+    :param time_radius: Number of bars on each side of the swing.
+    :param is_top: True to test for tops, False for bottoms.
+    :param backend: Name of the backend. The numpy backend is linear in the length of the data regardless of
+    time_radius.
+    :param trace: Trace recording this test, defaults to the installed trace.
+    :return: Boolean array, element i is is_swing(data_set, i, time_radius, is_top).
+    """
+    mask = SWING_BACKENDS[backend].swing_mask(data_set, time_radius, is_top)
+    trace = trace if trace is not None else _active_trace
+    if trace is not None:
+        trace.record_mask(time_radius, is_top, mask)
+    return mask
+
+
+def classify_swings(data_set: np.array, time_radius: int, backend: str = 'numpy',
+                    trace: SwingTrace | None = None) -> np.array:
+    """
+    Runs the top and bottom swing tests for every confirmation index of the data set in a single pass.
+
+    :param data_set: np.array of price data.
+    :param time_radius: Number of bars on each side of the swing.
+    :param backend: Name of the backend.
+    :param trace: Trace recording both tests, defaults to the installed trace.
+    :return: int8 array, element i has SWING_TOP set if is_swing(data_set, i, time_radius, True) and SWING_BOTTOM set
+    if is_swing(data_set, i, time_radius, False).
+    """
+    flags = SWING_BACKENDS[backend].classify(data_set, time_radius)
+    trace = trace if trace is not None else _active_trace
+    if trace is not None:
+        trace.record_mask(time_radius, True, (flags & SWING_TOP) != 0)
+        trace.record_mask(time_radius, False, (flags & SWING_BOTTOM) != 0)
+    return flags
+
+
+def benchmark_swing_backends(data_set: np.array, time_radius: int, repeats: int = 3) -> pd.DataFrame:
+    """
+    Times every registered backend on a full classification of the data set, tops and bottoms.
+
+    :param data_set: np.array of price data.
+    :param time_radius: Number of bars on each side of the swing.
+    :param repeats: Number of timed runs per backend, the best one is kept.
+    :return: DataFrame indexed by backend name with the best scan time in seconds and the speedup over the slowest
+    backend.
+    """
+    expected = None
+    timings = {}
+    for name in SWING_BACKENDS:
+        best = np.inf
+        for _ in range(repeats):
+            start = time.perf_counter()
+            flags = classify_swings(data_set, time_radius, name)
+            best = min(best, time.perf_counter() - start)
+
+        if expected is None:
+            expected = flags
+        assert (flags == expected).all(), f"Backend {name} disagrees"
+        timings[name] = best
+
+    result = pd.DataFrame({'seconds': pd.Series(timings)})
+    result['speedup'] = result['seconds'].max() / result['seconds']
+    return result
+
+
+def main() -> None:
+    """Benchmarks the swing backends on the daily and hourly BTCUSDT data."""
+    for file_name in ['BTCUSDT86400.csv', 'BTCUSDT3600.csv']:
+        data = pd.read_csv('.././data/' + file_name)
+        for time_radius in [3, 10, 48]:
+            print(f"{file_name} ({len(data)} bars), time_radius={time_radius}")
+            print(benchmark_swing_backends(data['close'].to_numpy(), time_radius))
+
+
+if __name__ == "__main__":
+    main()
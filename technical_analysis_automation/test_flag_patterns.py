@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 
 from flags_pennants import find_flags_pennants_pips
+from rolling_window import RollingExtremaIndex
 
 data = pd.read_csv('BTCUSDT3600.csv')
 data['date'] = data['date'].astype('datetime64[s]')
@@ -12,6 +13,7 @@ data = np.log(data)
 dat_slice = data['close'].to_numpy()
 
 orders = list(range(3, 49))
+extrema_index = RollingExtremaIndex(dat_slice, max(orders))  # Rolling extrema for every order in one pass
 bull_flag_wr = []
 bull_pennant_wr = []
 bear_flag_wr = []
@@ -33,8 +35,10 @@ bear_flag_total_ret = []
 bear_pennant_total_ret = []
 
 for order in orders:
-    bull_flags, bear_flags, bull_pennants, bear_pennants = find_flags_pennants_pips(dat_slice, order)
-    # bull_flags, bear_flags, bull_pennants, bear_pennants  = find_flags_pennants_trendline(dat_slice, order)
+    bull_flags, bear_flags, bull_pennants, bear_pennants = find_flags_pennants_pips(dat_slice, order,
+                                                                                    index=extrema_index)
+    # bull_flags, bear_flags, bull_pennants, bear_pennants  = find_flags_pennants_trendline(dat_slice, order,
+    #                                                                                       index=extrema_index)
 
     bull_flag_df = pd.DataFrame()
     bull_pennant_df = pd.DataFrame()
@@ -3,6 +3,7 @@ import numpy as np
 import pandas as pd
 
 from head_shoulders import find_patterns, HSPattern
+from rolling_window import RollingExtremaIndex
 
 
 class PatternAnalysis:
@@ -153,6 +154,7 @@ def main():
     dat_slice = data['close'].to_numpy()
 
     orders = list(range(1, 49))
+    extrema_index = RollingExtremaIndex(dat_slice, max(orders))  # Rolling extrema for every order in one pass
 
     ihs_analysis = PatternAnalysis()
     hs_analysis = PatternAnalysis()
@@ -160,8 +162,8 @@ def main():
     hs_early_analysis = PatternAnalysis()
 
     for order in orders:
-        hs_patterns, ihs_patterns = find_patterns(dat_slice, order, False)
-        hs_patterns_early, ihs_patterns_early = find_patterns(dat_slice, order, True)
+        hs_patterns, ihs_patterns = find_patterns(dat_slice, order, False, index=extrema_index)
+        hs_patterns_early, ihs_patterns_early = find_patterns(dat_slice, order, True, index=extrema_index)
 
         # Add patterns to analysis objects
         hs_analysis.add_patterns(hs_patterns, dat_slice, len(data))
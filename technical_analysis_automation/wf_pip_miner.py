@@ -1,13 +1,21 @@
+import weakref
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
 
-from perceptually_important import find_pips
+from perceptually_important import find_pips, find_pips_batch
 from pip_pattern_miner import PIPPatternMiner
 
 
 class WFPIPMiner:
 
-    def __init__(self, n_pips: int, lookback: int, hold_period: int, train_size: int, step_size: int):
+    def __init__(self, n_pips: int, lookback: int, hold_period: int, train_size: int, step_size: int,
+                 seed: int | np.random.SeedSequence | None = None, background: bool = False):
+        # seed makes every fold's training reproducible. With background, folds train in a worker process on a copy
+        # of their training slice while update_signal keeps predicting with the previous model.
         self._n_pips = n_pips
         self._lookback = lookback
         self._hold_period = hold_period
@@ -20,14 +28,34 @@ class WFPIPMiner:
         self._curr_sig = 0.0
         self._curr_hp = 0
 
+        self._seeds = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
         self._pip_miner = PIPPatternMiner(n_pips, lookback, hold_period)
 
+        self._background = background
+        self._train_pool = None
+        self._pool_finalizer = None  # Shuts the pool down if the miner is dropped without close
+        self._pending_model = None  # Future of the model state being trained in the background
+        self._pending_i = None  # Bar the pending training was started on
+        self._staleness = 0  # Bars the model in use has been behind the latest started training
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def get_staleness(self) -> int:
+        return self._staleness
+
     def update_signal(self, arr: np.array, i:int) -> float:
+        if self._pending_model is not None and self._pending_model.done():
+            self._swap_model()
+
         if i >= self._next_train:
-            self._pip_miner.train(arr[i - self._next_train + 1: i + 1 ])
+            self._start_training(arr[i - self._next_train + 1: i + 1 ], i)
             self._next_train += self._step_size
-            self._trained = True
 
+        self._staleness = 0 if self._pending_model is None else i - self._pending_i
         if not self._trained:
             return 0.0
 
@@ -45,6 +73,138 @@ class WFPIPMiner:
 
         return self._curr_sig
 
+    def run(self, arr: np.array, n_jobs: int = 1) -> np.array:
+        """
+        Replays the walk-forward over every bar of arr on a fresh miner, giving the signals update_signal would return
+        bar by bar. Folds are trained on the same slices, then the PIPs and predictions of the bars each fold serves
+        are computed in batch. Afterwards update_signal can carry on from bar len(arr).
+
+        :param arr: Array of log closing prices.
+        :param n_jobs: Worker processes training folds at the same time, 1 trains them one after another in this
+        process. Workers read arr from shared memory.
+        :return: Signal of every bar.
+        :raises ValueError: If the miner already received bars or trains in the background.
+        """
+        if self._background:
+            raise ValueError("run replays synchronously, use a miner without background training")
+        if self._trained or self._next_train != self._train_size - 1:
+            raise ValueError("run replays from the first bar, use a fresh miner")
+
+        n = len(arr)
+        train_bars = list(range(self._next_train, n, self._step_size))
+        if not train_bars:
+            return np.zeros(n)
+
+        if n_jobs == 1:
+            miners = (self._train_fold(arr[1: train_i + 1]) for train_i in train_bars)
+        else:
+            miners = self._train_folds_parallel(arr, train_bars, n_jobs)
+
+        # Prediction of every bar from the model of the latest fold trained on or before it
+        windows = sliding_window_view(arr, self._lookback)  # Window w ends at bar w + lookback - 1
+        pred = np.zeros(n)
+        for train_i, end_i, miner in zip(train_bars, train_bars[1:] + [n], miners):
+            self._pip_miner = miner
+            _, pips_y = find_pips_batch(windows[train_i - self._lookback + 1: end_i - self._lookback + 1],
+                                        self._n_pips, 3)
+            pred[train_i:end_i] = self._pip_miner.predict_batch(pips_y)
+
+        # A nonzero prediction is held for hold_period bars, or until the next one, and always on its own bar
+        bars = np.arange(n)
+        last = np.maximum.accumulate(np.where(pred != 0.0, bars, -1))
+        held = (last >= 0) & (bars - last < max(self._hold_period, 1))
+        signal = np.where(held, pred[last], 0.0)
+
+        # Leave the state of the last bar for update_signal
+        self._next_train = train_bars[-1] + self._step_size
+        self._trained = True
+        self._curr_sig = float(signal[-1])
+        self._curr_hp = max(self._hold_period - (n - 1 - last[-1]), 0) if last[-1] >= 0 else 0
+        return signal
+
+    def wait_for_training(self):
+        # Blocks until the training in the background, if any, is done and its model is in use
+        if self._pending_model is not None:
+            self._swap_model()
+        self._staleness = 0
+
+    def close(self):
+        self.wait_for_training()
+        if self._train_pool is not None:
+            self._pool_finalizer()
+            self._train_pool = None
+
+    def _train_fold(self, train_arr: np.array) -> PIPPatternMiner:
+        miner = PIPPatternMiner(self._n_pips, self._lookback, self._hold_period, seed=self._seeds.spawn(1)[0])
+        miner.train(train_arr)
+        return miner
+
+    def _train_folds_parallel(self, arr: np.array, train_bars: list, n_jobs: int) -> list:
+        # Trains the folds ending at train_bars in a process pool and returns their miners in fold order. Every fold
+        # gets the child seed it would get trained in order.
+        config = (self._n_pips, self._lookback, self._hold_period)
+        fold_seeds = self._seeds.spawn(len(train_bars))
+        shm = shared_memory.SharedMemory(create=True, size=max(len(arr), 1) * 8)
+        try:
+            np.ndarray(len(arr), dtype=np.float64, buffer=shm.buf)[:] = arr
+            with ProcessPoolExecutor(max_workers=n_jobs) as pool:
+                states = list(pool.map(_train_shared_fold, [config] * len(train_bars), [shm.name] * len(train_bars),
+                                       [len(arr)] * len(train_bars), train_bars, fold_seeds))
+        finally:
+            shm.close()
+            shm.unlink()
+
+        miners = []
+        for state in states:
+            miner = PIPPatternMiner(self._n_pips, self._lookback, self._hold_period)
+            miner.set_model_state(state)
+            miners.append(miner)
+        return miners
+
+    def _start_training(self, train_arr: np.array, i: int):
+        if not self._background:
+            self._pip_miner = self._train_fold(train_arr)
+            self._trained = True
+            return
+
+        # One training at a time, a fold due before the previous one is done waits for it
+        self.wait_for_training()
+        if self._train_pool is None:
+            self._train_pool = ProcessPoolExecutor(max_workers=1)
+            self._pool_finalizer = weakref.finalize(self, self._train_pool.shutdown)
+        config = (self._n_pips, self._lookback, self._hold_period)
+        self._pending_model = self._train_pool.submit(_train_model_state, config, train_arr.copy(),
+                                                      self._seeds.spawn(1)[0])
+        self._pending_i = i
+
+    def _swap_model(self):
+        # The new miner is built aside and replaces the old one in a single assignment
+        miner = PIPPatternMiner(self._n_pips, self._lookback, self._hold_period)
+        miner.set_model_state(self._pending_model.result())
+        self._pip_miner = miner
+        self._pending_model = None
+        self._trained = True
+
+
+def _train_model_state(config: tuple, train_arr: np.array, seed: np.random.SeedSequence) -> dict:
+    # Trains a miner on train_arr in a worker process, only the compact model state is sent back
+    miner = PIPPatternMiner(*config, seed=seed)
+    miner.train(train_arr)
+    return miner.get_model_state()
+
+
+def _train_shared_fold(config: tuple, shm_name: str, n_bars: int, train_i: int,
+                       seed: np.random.SeedSequence) -> dict:
+    # Trains the fold ending at bar train_i on the price array in shared memory, same slice as update_signal
+    shm = shared_memory.SharedMemory(name=shm_name)
+    try:
+        arr = np.ndarray(n_bars, dtype=np.float64, buffer=shm.buf)
+        state = _train_model_state(config, arr[1: train_i + 1], seed)
+        del arr  # The buffer can not be closed while a view of it exists
+        return state
+    finally:
+        shm.close()
+
 
 def main():
     data = pd.read_csv('.././data/BTCUSDT3600.csv')
@@ -61,11 +221,8 @@ def main():
         step_size=24 * 365 * 1
     )
 
-    sig = [0] * len(arr)
-    for i in range(len(arr)):
-        sig[i] = wf_miner.update_signal(arr, i)
-
-    data['sig'] = sig
+    # Same signals as calling wf_miner.update_signal(arr, i) for every bar i, with the folds trained in parallel
+    data['sig'] = wf_miner.run(arr, n_jobs=4)
     data['r'] = data['close'].diff().shift(-1)
     data['sig_r'] = data['sig'] * data['r']
 
@@ -0,0 +1,87 @@
+"""Tests of the batch, streaming and multi sigma directional change detectors."""
+import json
+
+import numpy as np
+import pandas as pd
+
+from technical_analysis_automation.directional_change import (
+    DirectionalChange,
+    directional_change,
+    directional_change_batch,
+    directional_change_multi,
+    get_extremes,
+)
+from technical_analysis_automation.extremes import EXTREMES_DTYPE
+
+
+def random_ohlc(n_bars: int, seed: int) -> tuple[np.array, np.array, np.array]:
+    """Close, high and low of a random walk of n_bars bars."""
+    rng = np.random.default_rng(seed)
+    close = np.exp(np.cumsum(rng.normal(scale=0.01, size=n_bars)))
+    high = close * np.exp(np.abs(rng.normal(scale=0.005, size=n_bars)))
+    low = close * np.exp(-np.abs(rng.normal(scale=0.005, size=n_bars)))
+    return close, high, low
+
+
+class TestDirectionalChange:
+    def test__directional_change__should_return_the_same_extremes_as_structured_arrays(self) -> None:
+        close, high, low = random_ohlc(3000, 0)
+        tops, bottoms = directional_change(close, high, low, 0.02)
+        structured_tops, structured_bottoms = directional_change(close, high, low, 0.02, structured=True)
+        assert structured_tops.dtype == EXTREMES_DTYPE
+        assert len(tops) > 0
+        assert structured_tops.tolist() == [tuple(top) for top in tops]
+        assert structured_bottoms.tolist() == [tuple(bottom) for bottom in bottoms]
+
+    def test__directional_change_stream__should_confirm_the_same_extremes(self) -> None:
+        close, high, low = random_ohlc(3000, 1)
+        tops, bottoms = directional_change(close, high, low, 0.015)
+
+        dc = DirectionalChange(0.015)
+        confirmed = [dc.update(c, h, lo) for c, h, lo in zip(close, high, low, strict=True)]
+        confirmed = [extreme for extreme in confirmed if extreme is not None]
+        assert [extreme[:3] for extreme in confirmed if extreme[3] == 1] == tops
+        assert [extreme[:3] for extreme in confirmed if extreme[3] == -1] == bottoms
+
+    def test__directional_change_stream__should_resume_from_a_snapshot(self) -> None:
+        close, high, low = random_ohlc(2000, 2)
+        dc = DirectionalChange(0.02)
+        uninterrupted = [dc.update(c, h, lo) for c, h, lo in zip(close, high, low, strict=True)]
+
+        dc = DirectionalChange(0.02)
+        resumed = [dc.update(c, h, lo) for c, h, lo in zip(close[:1000], high[:1000], low[:1000], strict=True)]
+        dc = DirectionalChange.restore(json.loads(json.dumps(dc.snapshot())))
+        resumed += [dc.update(c, h, lo) for c, h, lo in zip(close[1000:], high[1000:], low[1000:], strict=True)]
+        assert resumed == uninterrupted
+
+    def test__directional_change_multi__should_match_one_pass_per_sigma(self) -> None:
+        close, high, low = random_ohlc(3000, 3)
+        sigmas = [0.005, 0.01, 0.02, 0.04]
+        result = directional_change_multi(close, high, low, sigmas)
+        assert result == [directional_change(close, high, low, sigma) for sigma in sigmas]
+
+    def test__directional_change_batch__should_match_one_pass_per_symbol(self) -> None:
+        symbols = [random_ohlc(n_bars, seed) for seed, n_bars in enumerate([1500, 0, 3000, 1, 800])]
+        close, high, low = ([symbol[column] for symbol in symbols] for column in range(3))
+        sigmas = [0.01, 0.02, 0.005, 0.02, 0.03]
+        result = directional_change_batch(close, high, low, sigmas)
+        assert result[1] == ([], [])
+        assert result == [directional_change(c, h, lo, sigma) if len(c) else ([], [])
+                          for c, h, lo, sigma in zip(close, high, low, sigmas, strict=True)]
+
+        close, high, low = random_ohlc(6000, 5)
+        result = directional_change_batch(close.reshape(3, 2000), high.reshape(3, 2000), low.reshape(3, 2000), 0.01)
+        assert result == [directional_change(c, h, lo, 0.01) for c, h, lo in
+                          zip(close.reshape(3, 2000), high.reshape(3, 2000), low.reshape(3, 2000), strict=True)]
+
+    def test__get_extremes__should_sort_both_extreme_types_by_confirmation(self) -> None:
+        close, high, low = random_ohlc(3000, 4)
+        ohlc = pd.DataFrame({'close': close, 'high': high, 'low': low},
+                            index=pd.date_range('2020-01-01', periods=len(close), freq='h'))
+        tops, bottoms = directional_change(close, high, low, 0.02)
+        tops = pd.DataFrame(tops, columns=['conf_i', 'ext_i', 'ext_p'])
+        bottoms = pd.DataFrame(bottoms, columns=['conf_i', 'ext_i', 'ext_p'])
+        tops['type'] = 1
+        bottoms['type'] = -1
+        expected = pd.concat([tops, bottoms]).set_index('conf_i').sort_index()
+        pd.testing.assert_frame_equal(get_extremes(ohlc, 0.02), expected)
@@ -0,0 +1,58 @@
+"""Tests of the k-means clustering and silhouette scoring of patterns."""
+import numpy as np
+
+from technical_analysis_automation.pattern_clustering import (
+    kmeans,
+    kmeans_plusplus,
+    silhouette_ksearch,
+    silhouette_score,
+)
+
+
+def reference_silhouette(points: np.array, labels: np.array) -> float:
+    """Mean silhouette of points computed pair by pair, with squared euclidean distances."""
+    scores = []
+    for i in range(len(points)):
+        sq = ((points - points[i]) ** 2).sum(axis=1)
+        own = labels == labels[i]
+        if own.sum() == 1:
+            scores.append(0.0)
+            continue
+        a = sq[own].sum() / (own.sum() - 1)
+        b = min(sq[labels == c].mean() for c in set(labels.tolist()) if c != labels[i])
+        scores.append((b - a) / max(a, b))
+    return float(np.mean(scores))
+
+
+def blobs(seed: int) -> tuple[np.array, np.array]:
+    """600 points around 6 random centers in 4 dimensions, and the center each point belongs to."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(scale=10.0, size=(6, 4))
+    truth = rng.integers(0, 6, 600)
+    return centers[truth] + rng.normal(size=(600, 4)), truth
+
+
+class TestPatternClustering:
+    def test__kmeans__should_recover_well_separated_clusters(self) -> None:
+        points, truth = blobs(0)
+        labels, centers = kmeans(points, kmeans_plusplus(points, 6, np.random.default_rng(1)))
+        assert centers.shape == (6, 4)
+        # Every true cluster maps to exactly one found cluster
+        assert len({(t, label) for t, label in zip(truth.tolist(), labels.tolist(), strict=True)}) == 6
+
+    def test__silhouette_score__should_match_the_pairwise_definition(self) -> None:
+        points = np.random.default_rng(2).normal(size=(150, 3))
+        labels = np.random.default_rng(3).integers(0, 4, 150)
+        labels[0] = 4  # Singleton cluster
+        assert np.isclose(silhouette_score(points, labels, block_size=32), reference_silhouette(points, labels))
+
+    def test__silhouette_ksearch__should_be_reproducible_across_worker_counts(self) -> None:
+        points, _ = blobs(4)
+        amount, scores = silhouette_ksearch(points, 2, 10, seed=7)
+        parallel_amount, parallel_scores = silhouette_ksearch(points, 2, 10, seed=7, n_jobs=2)
+        assert amount == parallel_amount == 6
+        assert scores == parallel_scores
+
+        sampled_amount, sampled_scores = silhouette_ksearch(points, 2, 10, seed=7, sample_size=200)
+        assert sampled_amount == 6
+        assert abs(sampled_scores[6] - scores[6]) < 0.05
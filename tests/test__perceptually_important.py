@@ -0,0 +1,88 @@
+"""Tests of the single, batch, sliding and ranked PIP searches."""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from technical_analysis_automation.perceptually_important import (
+    SlidingWindowPIPs,
+    find_pips,
+    find_pips_batch,
+    pips_from_ranking,
+    rank_pips,
+)
+
+
+def reference_find_pips(data: np.array, n_pips: int, dist_measure: int) -> tuple[list, list]:
+    """PIPs of data found point by point as in the original loop."""
+    pips_x = [0, len(data) - 1]
+    pips_y = [data[0], data[-1]]
+    for curr_point in range(2, n_pips):
+        md, md_i, insert_index = 0.0, -1, -1
+        for k in range(0, curr_point - 1):
+            x_l, x_r, y_l, y_r = pips_x[k], pips_x[k + 1], pips_y[k], pips_y[k + 1]
+            slope = (y_r - y_l) / (x_r - x_l)
+            intercept = y_l - x_l * slope
+            for i in range(x_l + 1, x_r):
+                if dist_measure == 1:
+                    d = ((x_l - i) ** 2 + (y_l - data[i]) ** 2) ** 0.5 + ((x_r - i) ** 2 + (y_r - data[i]) ** 2) ** 0.5
+                elif dist_measure == 2:
+                    d = abs((slope * i + intercept) - data[i]) / (slope ** 2 + 1) ** 0.5
+                else:
+                    d = abs((slope * i + intercept) - data[i])
+                if d > md:
+                    md, md_i, insert_index = d, i, k + 1
+
+        pips_x.insert(insert_index, md_i)
+        pips_y.insert(insert_index, data[md_i])
+
+    return pips_x, pips_y
+
+
+class TestPerceptuallyImportant:
+    def test__find_pips__should_match_the_scalar_search(self) -> None:
+        rng = np.random.default_rng(4)
+        for n_bars in [3, 24, 60, 500]:
+            data = np.cumsum(rng.normal(size=n_bars))
+            for dist_measure in [1, 2, 3]:
+                for n_pips in [2, 3, 5, 10]:
+                    expected = reference_find_pips(data, min(n_pips, n_bars), dist_measure)
+                    assert find_pips(data, min(n_pips, n_bars), dist_measure) == expected
+
+    def test__find_pips__should_match_the_scalar_search_on_ties_and_nans(self) -> None:
+        rng = np.random.default_rng(8)
+        for _ in range(200):
+            data = rng.integers(0, 3, 30).astype(float)
+            data[rng.random(30) < 0.1] = np.nan
+            for dist_measure in [1, 2, 3]:
+                expected = reference_find_pips(data, 7, dist_measure)
+                assert repr(find_pips(data, 7, dist_measure)) == repr(expected)
+
+    def test__rank_pips__should_give_the_pips_of_find_pips_for_every_prefix(self) -> None:
+        data = np.cumsum(np.random.default_rng(6).normal(size=60))
+        for dist_measure in [1, 2, 3]:
+            ranking = rank_pips(data, dist_measure)
+            assert sorted(ranking.tolist()) == list(range(len(data)))
+            for n_pips in range(2, len(data) + 1):
+                assert pips_from_ranking(data, ranking, n_pips) == find_pips(data, n_pips, dist_measure)
+
+    def test__sliding_window_pips__should_match_find_pips_on_every_window(self) -> None:
+        rng = np.random.default_rng(10)
+        for data in [np.cumsum(rng.normal(size=600)), rng.integers(0, 4, 600).astype(float)]:
+            for dist_measure in [1, 2, 3]:
+                engine = SlidingWindowPIPs(data, 5, dist_measure)
+                for i in range(23, len(data)):
+                    pips_x, pips_y = find_pips(data[i - 23:i + 1], 5, dist_measure)
+                    assert engine.find(i - 23, i) == ([x + i - 23 for x in pips_x], pips_y)
+
+    def test__find_pips_batch__should_match_find_pips_on_every_window(self) -> None:
+        rng = np.random.default_rng(14)
+        nan_data = rng.normal(size=500)
+        nan_data[rng.random(500) < 0.05] = np.nan
+        for data in [np.cumsum(rng.normal(size=500)), rng.integers(0, 4, 500).astype(float), nan_data]:
+            windows = sliding_window_view(data, 24)
+            for dist_measure in [1, 2, 3]:
+                pips_x, pips_y = find_pips_batch(windows, 5, dist_measure, chunk_size=100)
+                assert pips_x.shape == (len(windows), 5)
+                for row, window in enumerate(windows):
+                    expected_x, expected_y = find_pips(window, 5, dist_measure)
+                    assert pips_x[row].tolist() == expected_x
+                    assert repr(pips_y[row].tolist()) == repr([float(y) for y in expected_y])
@@ -0,0 +1,120 @@
+"""Tests of the PIP pattern miner and its pattern store."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from technical_analysis_automation.pip_pattern_miner import PatternStore, PIPPatternMiner, martin_ratios
+
+
+def random_log_prices(n_bars: int, seed: int) -> np.array:
+    """Random walk of n_bars log prices."""
+    return np.cumsum(np.random.default_rng(seed).normal(scale=0.01, size=n_bars))
+
+
+def reference_predict(miner: PIPPatternMiner, pips_y: np.array) -> float:
+    """Prediction of miner for pips_y from the nearest cluster center, as in the original loop."""
+    norm_y = (pips_y - np.mean(pips_y)) / np.std(pips_y)
+    dists = [np.linalg.norm(norm_y - np.array(center)) for center in miner._cluster_centers]
+    best_clust = int(np.argmin(dists)) if not np.isnan(dists).any() else -1
+    if best_clust in miner._selected_long:
+        return 1.0
+    if best_clust in miner._selected_short:
+        return -1.0
+    return 0.0
+
+
+def reference_martin(rets: pd.Series) -> float:
+    """Martin ratio of rets computed on a pd.Series."""
+    rsum = rets.sum()
+    if rsum < 0.0:
+        rets = -rets
+    eq = np.exp(rets.cumsum())
+    ulcer_index = (((eq / eq.cummax()) - 1) ** 2.0).sum() / len(rets)
+    return rsum / np.sqrt(ulcer_index)
+
+
+class TestPIPPatternMiner:
+    def test__train__should_give_the_same_permutation_martins_in_parallel(self) -> None:
+        arr = random_log_prices(1500, 0)
+        results = []
+        for n_jobs in [1, 2]:
+            miner = PIPPatternMiner(5, 24, 6, seed=3, n_jobs=n_jobs, silhouette_sample=300)
+            miner.train(arr, n_reps=4)
+            results.append((miner.get_fit_martin(), miner.get_permutation_martins()))
+
+        assert len(results[0][1]) == 3
+        assert results[0] == results[1]
+
+    def test__train__should_stop_the_permutation_test_once_the_pvalue_is_resolved(self) -> None:
+        arr = random_log_prices(1200, 1)
+        results = []
+        for n_jobs in [1, 2]:
+            miner = PIPPatternMiner(5, 24, 6, seed=4, n_jobs=n_jobs, silhouette_sample=200)
+            miner.train(arr, n_reps=40, alpha=0.2)
+            results.append((miner.get_permutation_reps(), miner.get_permutation_pvalue()))
+
+        reps, pvalue = results[0]
+        assert 5 <= reps < 39
+        assert pvalue > 0.2
+        assert results[0] == results[1]
+
+        # A new fit without a permutation test drops the previous results
+        miner.train(arr)
+        assert miner.get_permutation_reps() is None and miner.get_permutation_pvalue() is None
+        assert miner.get_permutation_martins() == []
+
+    def test__predict_batch__should_match_nearest_center_lookup(self) -> None:
+        arr = random_log_prices(1500, 2)
+        miner = PIPPatternMiner(5, 24, 6, seed=1, silhouette_sample=300)
+        miner.train(arr)
+
+        patterns = np.random.default_rng(3).normal(size=(500, 5))
+        patterns[0] = [1.0, 2.0, np.nan, 3.0, 4.0]
+        signals = miner.predict_batch(patterns)
+        assert signals.tolist() == [reference_predict(miner, pattern) for pattern in patterns]
+        assert (signals != 0.0).any()
+        assert [miner.predict(list(pattern)) for pattern in patterns[:20]] == signals[:20].tolist()
+
+    def test__pattern_store__should_keep_every_pattern_when_it_grows(self) -> None:
+        rng = np.random.default_rng(5)
+        patterns, indices = rng.normal(size=(100, 5)), rng.integers(0, 1000, 100)
+        store = PatternStore(5, capacity=4)
+        store.append(patterns[0], indices[0])
+        for start in range(1, 100, 7):
+            store.extend(patterns[start:start + 7], indices[start:start + 7])
+
+        assert len(store) == 100
+        assert (store.patterns == patterns).all()
+        assert (store.indices == indices).all()
+        assert store.patterns.dtype == np.float64 and store.indices.dtype == np.int64
+
+        store.clear()
+        assert store.patterns.shape == (0, 5)
+
+    def test__martin_ratios__should_match_the_pandas_martin_of_every_row(self) -> None:
+        rng = np.random.default_rng(6)
+        rets = rng.normal(scale=0.01, size=(30, 400)) * (rng.random((30, 1)) < 0.8)
+        rets[rng.random(rets.shape) < 0.05] = np.nan
+        rets[1, :3] = np.nan
+        rets[:, -1] = np.nan
+        with np.errstate(divide='ignore', invalid='ignore'):
+            expected = [reference_martin(pd.Series(row)) for row in rets]
+        np.testing.assert_allclose(martin_ratios(rets), expected, rtol=1e-13)
+
+    def test__load__should_restore_the_predictions_of_a_saved_model(self, tmp_path) -> None:
+        arr = random_log_prices(1500, 7)
+        miner = PIPPatternMiner(5, 24, 6, seed=2, silhouette_sample=300)
+        miner.train(arr)
+        miner.save(tmp_path / 'model.npz')
+
+        loaded = PIPPatternMiner(5, 24, 6)
+        loaded.load(tmp_path / 'model.npz', data=arr)
+        patterns = np.random.default_rng(8).normal(size=(300, 5))
+        assert loaded.predict_batch(patterns).tolist() == miner.predict_batch(patterns).tolist()
+        assert loaded.get_fit_martin() == miner.get_fit_martin()
+        assert loaded.get_data_fingerprint() == miner.get_data_fingerprint()
+
+        with pytest.raises(ValueError):
+            PIPPatternMiner(5, 48, 6).load(tmp_path / 'model.npz')
+        with pytest.raises(ValueError):
+            PIPPatternMiner(5, 24, 6).load(tmp_path / 'model.npz', data=arr[1:])
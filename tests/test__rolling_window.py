@@ -0,0 +1,95 @@
+"""Tests of the vectorized and streaming rolling window extreme detectors."""
+import numpy as np
+import pytest
+
+from technical_analysis_automation.extremes import EXTREMES_DTYPE
+from technical_analysis_automation.head_shoulders import find_patterns
+from technical_analysis_automation.rolling_window import (
+    RollingExtremaDetector,
+    RollingExtremaIndex,
+    rw_bottom,
+    rw_extreme_flags,
+    rw_extreme_masks,
+    rw_extremes,
+    rw_top,
+)
+
+
+def reference_extremes(data: np.array, order: int) -> tuple[list, list]:
+    """Tops and bottoms of data found with rw_top and rw_bottom bar by bar."""
+    tops = [[i, i - order, data[i - order]] for i in range(len(data)) if rw_top(data, i, order)]
+    bottoms = [[i, i - order, data[i - order]] for i in range(len(data)) if rw_bottom(data, i, order)]
+    return tops, bottoms
+
+
+class TestRollingWindow:
+    def test__rw_extreme_masks__should_match_rw_top_and_rw_bottom(self) -> None:
+        rng = np.random.default_rng(7)
+        data = rng.integers(0, 6, 500).astype(float)  # Small integer range to force ties
+        for order in range(1, 12):
+            tops, bottoms = rw_extreme_masks(data, order)
+            assert tops.tolist() == [rw_top(data, i, order) for i in range(len(data))]
+            assert bottoms.tolist() == [rw_bottom(data, i, order) for i in range(len(data))]
+
+    def test__rw_extreme_masks__should_ignore_nans_like_rw_top(self) -> None:
+        rng = np.random.default_rng(3)
+        data = np.where(rng.random(300) < 0.1, np.nan, rng.normal(size=300))
+        tops, bottoms = rw_extreme_masks(data, 4)
+        assert tops.tolist() == [rw_top(data, i, 4) for i in range(len(data))]
+        assert bottoms.tolist() == [rw_bottom(data, i, 4) for i in range(len(data))]
+
+    def test__rw_extremes__should_match_reference(self) -> None:
+        data = np.cumsum(np.random.default_rng(11).normal(size=2000))
+        for order in [1, 3, 10, 25]:
+            assert rw_extremes(data, order) == reference_extremes(data, order)
+
+    def test__rw_extremes__should_be_empty_when_data_is_too_short(self) -> None:
+        assert rw_extremes(np.array([1.0, 2.0, 1.0]), 1) == ([], [])
+
+    def test__rolling_extrema_detector__should_emit_the_same_extremes_as_rw_extremes(self) -> None:
+        rng = np.random.default_rng(5)
+        data = np.where(rng.random(1500) < 0.02, np.nan, rng.integers(0, 8, 1500).astype(float))
+        for order in [1, 2, 6, 20]:
+            detector = RollingExtremaDetector(order)
+            tops, bottoms = [], []
+            for price in data:
+                top, bottom = detector.push(price)
+                if top is not None:
+                    tops.append(top)
+                if bottom is not None:
+                    bottoms.append(bottom)
+
+            expected_tops, expected_bottoms = rw_extremes(data, order)
+            assert repr(tops) == repr(expected_tops)
+            assert repr(bottoms) == repr(expected_bottoms)
+
+    def test__find_patterns__should_accept_a_streaming_detector(self) -> None:
+        data = np.cumsum(np.random.default_rng(2).normal(size=5000))
+        expected = find_patterns(data, 4, early_find=True)
+        result = find_patterns(data, 4, early_find=True, detector=RollingExtremaDetector(4))
+        assert repr(result) == repr(expected)
+
+    def test__rolling_extrema_index__should_match_rw_extremes_for_every_order(self) -> None:
+        rng = np.random.default_rng(9)
+        data = np.where(rng.random(800) < 0.02, np.nan, rng.integers(0, 10, 800).astype(float))
+        index = RollingExtremaIndex(data, max_order=48)
+        for order in range(0, 49):
+            assert repr(index.extremes(order)) == repr(rw_extremes(data, order))
+            tops, bottoms = index.masks(order)
+            expected_tops, expected_bottoms = rw_extreme_masks(data, order)
+            assert (tops == expected_tops).all()
+            assert (bottoms == expected_bottoms).all()
+
+    def test__rw_extremes__should_return_the_same_extremes_as_structured_arrays(self) -> None:
+        data = np.cumsum(np.random.default_rng(12).normal(size=1000))
+        tops, bottoms = rw_extremes(data, 5)
+        structured_tops, structured_bottoms = rw_extremes(data, 5, structured=True)
+        assert structured_tops.dtype == EXTREMES_DTYPE
+        assert structured_tops.tolist() == [tuple(top) for top in tops]
+        assert structured_bottoms.tolist() == [tuple(bottom) for bottom in bottoms]
+
+    def test__rw_extreme_flags__should_reject_a_detector_that_already_has_bars(self) -> None:
+        detector = RollingExtremaDetector(2)
+        detector.push(1.0)
+        with pytest.raises(AssertionError):
+            rw_extreme_flags(np.ones(10), 2, detector)
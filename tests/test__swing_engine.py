@@ -0,0 +1,82 @@
+"""Tests of the swing engine backends and swing tracing."""
+import numpy as np
+
+from technical_analysis_automation.rolling_window import rw_bottom, rw_top
+from technical_analysis_automation.swing_chart_candle_plotter import (
+    detect_swing_extremes_across_data_set,
+    is_data_point_a_local_swing,
+)
+from technical_analysis_automation.swing_chart_rolling_window import is_rolling_window_swing
+from technical_analysis_automation.swing_engine import (
+    SWING_BACKENDS,
+    SWING_BOTTOM,
+    SWING_TOP,
+    SwingTrace,
+    classify_swings,
+    is_swing,
+    swing_mask,
+    swing_tracing,
+)
+
+
+class TestSwingEngine:
+    def test__swing_mask__should_agree_across_backends(self) -> None:
+        rng = np.random.default_rng(4)
+        data = np.where(rng.random(400) < 0.05, np.nan, rng.integers(0, 6, 400).astype(float))
+        for time_radius in [1, 3, 9]:
+            for is_top in [True, False]:
+                masks = [swing_mask(data, time_radius, is_top, name) for name in SWING_BACKENDS]
+                assert all((mask == masks[0]).all() for mask in masks)
+
+    def test__classify_swings__should_combine_top_and_bottom_masks(self) -> None:
+        data = np.random.default_rng(8).integers(0, 4, 300).astype(float)
+        for name in SWING_BACKENDS:
+            flags = classify_swings(data, 2, name)
+            assert (((flags & SWING_TOP) != 0) == swing_mask(data, 2, True)).all()
+            assert (((flags & SWING_BOTTOM) != 0) == swing_mask(data, 2, False)).all()
+
+    def test__is_swing__should_agree_with_swing_mask(self) -> None:
+        data = np.array([1, 2, 3, 4, 5, 4, 3, 2, 1, 2, 3, 2, 1])
+        for name in SWING_BACKENDS:
+            expected = swing_mask(data, 2, False)
+            assert [is_swing(data, i, 2, False, name) for i in range(len(data))] == expected.tolist()
+
+    def test__swing_trace__should_count_bars_early_exits_and_swings(self) -> None:
+        data = np.array([1, 2, 3, 4, 5, 4, 3, 2, 1, 2, 3, 2, 1])
+        trace = SwingTrace(sample_every=5)
+        tops, bottoms = detect_swing_extremes_across_data_set(data, 2, trace)
+        assert trace.bars_tested == 2 * len(data)
+        assert trace.early_exits == 2 * 5
+        assert trace.swings_found == len(tops) + len(bottoms)
+        assert [record[0] for record in trace.records] == [0, 5, 10, 2, 7, 12]
+
+    def test__swing_trace__should_match_between_single_queries_and_masks(self) -> None:
+        data = np.random.default_rng(1).normal(size=200)
+        single, bulk = SwingTrace(sample_every=7), SwingTrace(sample_every=7)
+        with swing_tracing(single):
+            for i in range(len(data)):
+                is_swing(data, i, 3, True)
+        with swing_tracing(bulk):
+            swing_mask(data, 3, True)
+        assert single == bulk
+
+    def test__swing_trace__should_record_when_passed_to_the_test(self) -> None:
+        data = np.random.default_rng(2).normal(size=100)
+        passed, installed = SwingTrace(sample_every=3), SwingTrace(sample_every=3)
+        classify_swings(data, 4, trace=passed)
+        with swing_tracing(installed):
+            classify_swings(data, 4)
+        assert passed == installed
+
+    def test__swing_trace__should_record_when_passed_to_the_wrappers(self) -> None:
+        data = np.random.default_rng(3).normal(size=40)
+        trace = SwingTrace()
+        for i in range(len(data)):
+            is_data_point_a_local_swing(data, i, 2, True, trace=trace)
+            is_rolling_window_swing(data, i, 2, True, trace=trace)
+            rw_top(data, i, 2, trace=trace)
+            rw_bottom(data, i, 2, trace=trace)
+        tops = sum(is_swing(data, i, 2, True) for i in range(len(data)))
+        bottoms = sum(is_swing(data, i, 2, False) for i in range(len(data)))
+        assert trace.bars_tested == 4 * len(data)
+        assert trace.swings_found == 3 * tops + bottoms
@@ -0,0 +1,65 @@
+"""Tests of the walk-forward PIP miner."""
+import numpy as np
+import pytest
+
+from technical_analysis_automation.wf_pip_miner import WFPIPMiner
+
+
+def random_log_prices(n_bars: int, seed: int) -> np.array:
+    """Random walk of n_bars log prices."""
+    return np.cumsum(np.random.default_rng(seed).normal(scale=0.01, size=n_bars))
+
+
+class TestWFPIPMiner:
+    def test__update_signal__should_train_the_same_models_in_the_background(self) -> None:
+        arr = random_log_prices(2200, 0)
+        expected = WFPIPMiner(5, 24, 6, train_size=1200, step_size=500, seed=1)
+        for i in range(len(arr)):
+            expected.update_signal(arr, i)
+
+        with WFPIPMiner(5, 24, 6, train_size=1200, step_size=500, seed=1, background=True) as miner:
+            signals, staleness = [], []
+            for i in range(len(arr)):
+                signals.append(miner.update_signal(arr, i))
+                staleness.append(miner.get_staleness())
+                if i == 1199:
+                    # Training started on this bar, predictions wait for its model
+                    assert miner._pending_model is not None and not miner._trained
+
+            miner.wait_for_training()
+            state = miner._pip_miner.get_model_state()
+
+        expected_state = expected._pip_miner.get_model_state()
+        for key in expected_state:
+            assert (state[key] == expected_state[key]).all()
+
+        # Staleness counts the bars since the training started until its model is swapped in
+        for train_i in [1199, 1699]:
+            swap_i = next((i for i in range(train_i + 1, len(arr)) if staleness[i] == 0), len(arr))
+            assert staleness[train_i:swap_i] == list(range(swap_i - train_i))
+        assert signals[:1200] == [0.0] * 1200
+        assert miner._train_pool is None
+
+    def test__run__should_give_the_signals_of_the_per_bar_loop(self) -> None:
+        arr = random_log_prices(2500, 2)
+        for hold_period in [0, 1, 6]:
+            expected = WFPIPMiner(5, 24, hold_period, train_size=1000, step_size=400, seed=hold_period)
+            expected = [expected.update_signal(arr, i) for i in range(len(arr))]
+
+            # Replay the first bars in batch, then carry on bar by bar
+            miner = WFPIPMiner(5, 24, hold_period, train_size=1000, step_size=400, seed=hold_period)
+            signals = miner.run(arr[:2300]).tolist() + [miner.update_signal(arr, i) for i in range(2300, len(arr))]
+            assert signals == expected
+            assert any(signal != 0.0 for signal in expected)
+
+        # Only a fresh synchronous miner can replay from the first bar
+        with pytest.raises(ValueError):
+            miner.run(arr)
+        with pytest.raises(ValueError):
+            WFPIPMiner(5, 24, 6, train_size=1000, step_size=400, background=True).run(arr)
+
+    def test__run__should_give_the_same_signals_with_folds_trained_in_parallel(self) -> None:
+        arr = random_log_prices(2600, 3)
+        expected = WFPIPMiner(5, 24, 6, train_size=1000, step_size=500, seed=4).run(arr)
+        signals = WFPIPMiner(5, 24, 6, train_size=1000, step_size=500, seed=4).run(arr, n_jobs=2)
+        assert signals.tolist() == expected.tolist()